@@ -1,7 +1,13 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Generator
+from typing import Dict, Any, List, Optional, Generator
 import json
+import time
+import uuid
+import requests
+from app.config import settings
 from app.storage.redis import get_redis
+from app.ingestion.state_manager import StateManager
+from app.utils.hashing import compute_hash
 
 class BaseAgent(ABC):
     """
@@ -10,10 +16,44 @@ class BaseAgent(ABC):
     Supports both batch fetch (returning list) and streaming (pushing to Redis).
     """
 
+    # Per-agent limit (seconds) for IngestionOrchestrator.run_agents; None uses the run default
+    timeout: Optional[float] = None
+
     def __init__(self, provider: str):
         self.provider = provider
         self.redis = get_redis()
         self.stream_key = "stream:ingestion"
+        self.state_manager = StateManager()
+        # State (hash / validators) to record once this run has been published
+        self._pending_hashes: Dict[str, str] = {}
+        self._pending_validators: Dict[str, Dict[str, str]] = {}
+        # Validators returned by the source, staged only after a successful extraction
+        self._fetched_validators: Dict[str, Dict[str, str]] = {}
+        # Epoch seconds when the current crawl started, stamped on every message
+        self.crawl_started_at: Optional[float] = None
+
+    def mark_crawl_start(self):
+        """
+        Marks the start of a crawl and drops state staged by an earlier run
+        that was never committed. Called by the orchestrator before fetching;
+        pushes without a marker use the publish time instead.
+        """
+        self.crawl_started_at = time.time()
+        self._pending_hashes = {}
+        self._pending_validators = {}
+        self._fetched_validators = {}
+
+    def trace_fields(self) -> Dict[str, str]:
+        """
+        Stream fields that let the worker trace a message back to its crawl:
+        a trace id plus crawl-start and publish times (epoch seconds).
+        """
+        published_at = time.time()
+        return {
+            "trace_id": uuid.uuid4().hex,
+            "crawl_started_at": f"{self.crawl_started_at or published_at:.3f}",
+            "published_at": f"{published_at:.3f}"
+        }
 
     @abstractmethod
     def fetch(self) -> List[Dict[str, Any]]:
@@ -22,7 +62,83 @@ class BaseAgent(ABC):
         Returns a list of dictionaries.
         """
         pass
+
+    def iter_fetch(self) -> Generator[Dict[str, Any], None, None]:
+        """
+        Streaming variant of fetch(): yields items as they are parsed so
+        they can be published while the source is still being read.
+        Agents that can stream should override this; the default
+        falls back to the batch fetch().
+        """
+        yield from self.fetch()
         
+    def source_not_modified(self, url: str) -> bool:
+        """
+        Conditional GET against the source using the ETag / Last-Modified
+        validators from the previous run. Returns True only on a 304; sources
+        that don't send validators are always treated as modified. New
+        validators are only recorded once stage_validators() is called.
+        """
+        if not settings.CRAWL_USE_VALIDATORS:
+            return False
+        try:
+            stored = self.state_manager.get_validators(url)
+            headers = {}
+            if stored.get("etag"):
+                headers["If-None-Match"] = stored["etag"]
+            if stored.get("last_modified"):
+                headers["If-Modified-Since"] = stored["last_modified"]
+
+            response = requests.get(url, headers=headers, timeout=15)
+            if response.status_code == 304:
+                return True
+
+            validators = {}
+            if response.headers.get("ETag"):
+                validators["etag"] = response.headers["ETag"]
+            if response.headers.get("Last-Modified"):
+                validators["last_modified"] = response.headers["Last-Modified"]
+            self._fetched_validators[url] = validators
+        except Exception as e:
+            print(f"Conditional request to {url} failed: {e}")
+        return False
+
+    def stage_validators(self, url: str):
+        """
+        Stages the validators source_not_modified(url) received for
+        commit_state(). Call only once the source has been extracted
+        successfully, otherwise a failed crawl would make the next run
+        see a 304 and skip the source until it changes.
+        """
+        if url in self._fetched_validators:
+            self._pending_validators[url] = self._fetched_validators.pop(url)
+
+    def is_unchanged(self, state_key: str, raw_data: Any) -> bool:
+        """
+        Fingerprints the raw extracted data and checks it against the last
+        published run. The new fingerprint is only recorded by commit_state().
+        Empty data (a failed or blocked extraction) is never fingerprinted.
+        """
+        if not raw_data:
+            return False
+        data_hash = compute_hash(raw_data)
+        if not self.state_manager.should_process(state_key, data_hash):
+            return True
+        self._pending_hashes[state_key] = data_hash
+        return False
+
+    def commit_state(self):
+        """
+        Records fingerprints and validators of the current run.
+        Called by the orchestrator once everything has been published.
+        """
+        for state_key, data_hash in self._pending_hashes.items():
+            self.state_manager.update_state(state_key, data_hash)
+        for url, validators in self._pending_validators.items():
+            self.state_manager.update_validators(url, validators)
+        self._pending_hashes = {}
+        self._pending_validators = {}
+
     def push_to_stream(self, data: Dict[str, Any]):
         """
         Push a single data item to the Redis Stream.
@@ -30,5 +146,30 @@ class BaseAgent(ABC):
         if "provider" not in data:
             data["provider"] = self.provider
             
-        self.redis.xadd(self.stream_key, {"payload": json.dumps(data)})
+        self.redis.xadd(self.stream_key, {"payload": json.dumps(data), **self.trace_fields()})
+
+    def push_many(self, items: List[Dict[str, Any]], chunk_size: Optional[int] = None, maxlen: Optional[int] = None) -> int:
+        """
+        Push many items to the Redis Stream using pipelined XADDs,
+        one round-trip per chunk. If maxlen is set, the stream is capped
+        approximately (MAXLEN ~) to that many entries.
+        Returns the number of items pushed.
+        """
+        chunk_size = chunk_size or settings.STREAM_PUSH_CHUNK_SIZE
+        maxlen = maxlen if maxlen is not None else settings.STREAM_MAXLEN
+
+        count = 0
+        for start in range(0, len(items), chunk_size):
+            pipe = self.redis.pipeline(transaction=False)
+            for data in items[start:start + chunk_size]:
+                if "provider" not in data:
+                    data["provider"] = self.provider
+                pipe.xadd(
+                    self.stream_key,
+                    {"payload": json.dumps(data), **self.trace_fields()},
+                    maxlen=maxlen or None,
+                    approximate=True
+                )
+            count += len(pipe.execute())
+        return count
 
@@ -0,0 +1,209 @@
+import asyncio
+import atexit
+import inspect
+import json
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+from playwright.async_api import async_playwright
+from app.config import settings
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
+
+# Caps open pages across the process
+_page_slots = threading.BoundedSemaphore(settings.BROWSER_POOL_MAX_PAGES)
+_pool: Optional["BrowserPool"] = None
+_pool_lock = threading.Lock()
+
+class BrowserPool:
+    """
+    Keeps one warm Chromium for the whole process and leases pages from
+    reusable browser contexts. Contexts are recycled after max_context_uses
+    leases, and the browser is relaunched if a health check finds it
+    disconnected.
+
+    Playwright runs on a single long-lived daemon thread with its own event
+    loop (async API). Any thread can lease a page; it gets a synchronous
+    proxy whose calls run on that loop, so crawls in different threads
+    share the browser and still wait concurrently.
+    """
+
+    def __init__(self, max_context_uses: Optional[int] = None, headless: bool = True):
+        self.max_context_uses = max_context_uses or settings.BROWSER_POOL_MAX_CONTEXT_USES
+        self.headless = headless
+        self._playwright = None
+        self._browser = None
+        # context options key -> [(context, uses)]
+        self._idle: Dict[str, List[Tuple[Any, int]]] = {}
+        self._loop = asyncio.new_event_loop()
+        self._launch_lock = asyncio.Lock()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="browser-pool", daemon=True)
+        self._thread.start()
+
+    def run(self, coro):
+        """
+        Runs a coroutine on the pool's loop and waits for its result.
+        """
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("Browser pool: blocking call from the browser thread")
+        if not self._thread.is_alive():
+            coro.close()
+            raise RuntimeError("Browser pool: closed")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def healthy(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _ensure_browser(self):
+        async with self._launch_lock:
+            if self.healthy():
+                return
+            if self._browser is not None:
+                print("Browser pool: browser disconnected, relaunching...")
+                await self._close()
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=self.headless)
+            self._idle = {}
+
+    async def _lease(self, key: str, context_options: Dict[str, Any]):
+        await self._ensure_browser()
+        idle = self._idle.setdefault(key, [])
+        context, uses = idle.pop() if idle else (await self._browser.new_context(**context_options), 0)
+        return context, uses, await context.new_page()
+
+    @contextmanager
+    def page(self, timeout: float = 120, **context_options):
+        """
+        Leases a page from a context created with context_options
+        (user_agent defaults to DEFAULT_USER_AGENT). The page is closed and
+        its context returned to the pool when the block exits.
+        """
+        if not _page_slots.acquire(timeout=timeout):
+            raise TimeoutError("Browser pool: no free page slot")
+        try:
+            context_options.setdefault("user_agent", DEFAULT_USER_AGENT)
+            key = json.dumps(context_options, sort_keys=True)
+            context, uses, page = self.run(self._lease(key, context_options))
+            try:
+                yield _SyncProxy(self, page)
+            finally:
+                self.run(self._release(key, context, uses + 1, page))
+        finally:
+            _page_slots.release()
+
+    async def _release(self, key: str, context, uses: int, page):
+        try:
+            await page.close()
+            if uses < self.max_context_uses and self.healthy():
+                self._idle.setdefault(key, []).append((context, uses))
+                return
+            await context.close()
+        except Exception as e:
+            # Context is unusable, let the next lease create a fresh one
+            print(f"Browser pool: dropping context: {e}")
+
+    async def _close(self):
+        try:
+            if self._browser is not None:
+                await self._browser.close()
+        except Exception as e:
+            print(f"Browser pool: error closing browser: {e}")
+        finally:
+            if self._playwright is not None:
+                await self._playwright.stop()
+            self._browser = None
+            self._playwright = None
+            self._idle = {}
+
+    def close(self):
+        """
+        Closes the browser and stops the pool's thread.
+        """
+        if not self._loop.is_running():
+            return
+        try:
+            self.run(self._close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+class _SyncProxy:
+    """
+    Synchronous view of a Playwright async API object owned by a BrowserPool.
+    Method calls run on the pool's loop; Playwright objects they return are
+    proxied too, and callbacks passed in (route handlers) are run in a
+    worker thread so they can use the proxies they receive.
+    """
+
+    def __init__(self, pool: BrowserPool, target):
+        self._pool = pool
+        self._target = target
+
+    def __getattr__(self, name: str):
+        value = getattr(self._target, name)
+        if not callable(value):
+            return _wrap(self._pool, value)
+
+        def call(*args, **kwargs):
+            args = [self._argument(a) for a in args]
+            kwargs = {k: self._argument(v) for k, v in kwargs.items()}
+            return _wrap(self._pool, self._pool.run(_invoke(value, args, kwargs)))
+        return call
+
+    def _argument(self, value):
+        if isinstance(value, _SyncProxy):
+            return value._target
+        if callable(value):
+            return self._callback(value)
+        return value
+
+    def _callback(self, func):
+        pool = self._pool
+        arg_count = _positional_count(func)
+
+        async def handler(*args):
+            # handler takes *args, so Playwright passes everything it has
+            # (e.g. route and request); forward only what func accepts
+            call_args = args if arg_count is None else args[:arg_count]
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, lambda: func(*[_wrap(pool, a) for a in call_args]))
+        return handler
+
+    def __repr__(self):
+        return f"<sync {self._target!r}>"
+
+def _positional_count(func) -> Optional[int]:
+    """
+    Number of positional arguments func accepts, None if unlimited. Same rule
+    Playwright applies to the handlers it calls.
+    """
+    parameters = inspect.signature(func).parameters.values()
+    if any(p.kind == inspect.Parameter.VAR_POSITIONAL for p in parameters):
+        return None
+    return sum(p.kind in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD) for p in parameters)
+
+async def _invoke(func, args, kwargs):
+    result = func(*args, **kwargs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+def _wrap(pool: BrowserPool, value):
+    if isinstance(value, list):
+        return [_wrap(pool, v) for v in value]
+    if type(value).__module__.startswith("playwright."):
+        return _SyncProxy(pool, value)
+    return value
+
+def get_browser_pool() -> BrowserPool:
+    """
+    Returns the process-wide pool, creating it on first use (or after it was
+    closed). It is closed at interpreter exit.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or not _pool._thread.is_alive():
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+        return _pool
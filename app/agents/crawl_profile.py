@@ -0,0 +1,75 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence
+from app.config import settings
+
+class CrawlProfile:
+    """
+    Lean crawl behaviour for a single crawl: blocks non-essential resource
+    types, treats a table as ready once its row count stops changing
+    (instead of sleeping for a fixed time) and records how long each
+    crawl phase took in `timings` (milliseconds).
+    """
+
+    def __init__(
+        self,
+        blocked_resource_types: Optional[Sequence[str]] = None,
+        settle_interval_ms: Optional[int] = None,
+        stable_checks: Optional[int] = None,
+        max_wait_ms: Optional[int] = None
+    ):
+        if blocked_resource_types is None:
+            blocked_resource_types = [t.strip() for t in settings.CRAWL_BLOCK_RESOURCES.split(",") if t.strip()]
+        self.blocked_resource_types = set(blocked_resource_types)
+        self.settle_interval_ms = settle_interval_ms or settings.CRAWL_SETTLE_INTERVAL_MS
+        self.stable_checks = stable_checks or settings.CRAWL_STABLE_CHECKS
+        self.max_wait_ms = max_wait_ms or settings.CRAWL_MAX_WAIT_MS
+        self.timings: Dict[str, float] = {}
+
+    def apply(self, page):
+        """
+        Installs request interception on the page.
+        """
+        if self.blocked_resource_types:
+            page.route("**/*", self._handle_route)
+
+    def _handle_route(self, route):
+        if route.request.resource_type in self.blocked_resource_types:
+            route.abort()
+        else:
+            route.continue_()
+
+    def wait_for_rows(self, page, row_selector: str) -> int:
+        """
+        Polls the number of rows matching row_selector until it is non-zero
+        and unchanged for stable_checks consecutive polls, or max_wait_ms
+        has passed. Returns the last row count.
+        """
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        last_count = -1
+        stable = 0
+        while True:
+            count = page.locator(row_selector).count()
+            if count and count == last_count:
+                stable += 1
+                if stable >= self.stable_checks:
+                    return count
+            else:
+                stable = 0
+            last_count = count
+
+            if time.monotonic() >= deadline:
+                print(f"Rows still changing after {self.max_wait_ms} ms, continuing with {count}")
+                return count
+            page.wait_for_timeout(self.settle_interval_ms)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    def summary(self) -> str:
+        return ", ".join(f"{name} {ms} ms" for name, ms in self.timings.items())
@@ -0,0 +1,69 @@
+from typing import List, Optional, Sequence
+from app.config import settings
+
+# Each column is a list of CSS selectors tried in order inside the cell.
+# An empty string stands for the cell itself; a column whose selectors
+# all miss yields None.
+ColumnSpec = Sequence[str]
+
+# Pulls the whole table in a single page.evaluate round-trip
+_EXTRACT_TABLE_JS = """
+([rowSelector, columns, minCells]) => {
+    const rows = [];
+    for (const row of document.querySelectorAll(rowSelector)) {
+        const cells = row.querySelectorAll("td");
+        if (cells.length < minCells) continue;
+        rows.push(columns.map((selectors, i) => {
+            const cell = cells[i];
+            if (!cell) return null;
+            for (const selector of selectors) {
+                const elem = selector ? cell.querySelector(selector) : cell;
+                if (elem) return elem.innerText.trim();
+            }
+            return null;
+        }));
+    }
+    return rows;
+}
+"""
+
+def extract_table(page, row_selector: str, columns: List[ColumnSpec], min_cells: int, mode: Optional[str] = None) -> List[List[Optional[str]]]:
+    """
+    Extracts the text of every row matching row_selector as a list of
+    column values. The "evaluate" mode does it in one browser round-trip;
+    "dom" (and any evaluate failure) falls back to per-cell element handles.
+    """
+    mode = mode or settings.CRAWL_EXTRACTION_MODE
+    if mode == "evaluate":
+        try:
+            return page.evaluate(_EXTRACT_TABLE_JS, [row_selector, [list(c) for c in columns], min_cells])
+        except Exception as e:
+            print(f"Evaluate extraction failed, falling back to per-cell: {e}")
+    return extract_table_dom(page, row_selector, columns, min_cells)
+
+def extract_table_dom(page, row_selector: str, columns: List[ColumnSpec], min_cells: int) -> List[List[Optional[str]]]:
+    """
+    Per-cell extraction through element handles. One protocol round-trip
+    per query, so only used as a fallback.
+    """
+    rows = []
+    for row in page.query_selector_all(row_selector):
+        try:
+            cells = row.query_selector_all("td")
+            if len(cells) < min_cells:
+                continue
+            rows.append([_cell_text(cells, i, selectors) for i, selectors in enumerate(columns)])
+        except Exception as e:
+            print(f"Error reading row: {e}")
+            continue
+    return rows
+
+def _cell_text(cells, index: int, selectors: ColumnSpec) -> Optional[str]:
+    if index >= len(cells):
+        return None
+    cell = cells[index]
+    for selector in selectors:
+        elem = cell.query_selector(selector) if selector else cell
+        if elem:
+            return elem.inner_text().strip()
+    return None
@@ -5,70 +5,64 @@ import os
 # Add project root to path for imports
 sys.path.append(os.getcwd())
 
-from playwright.sync_api import sync_playwright
 import json
-import time
 from app.config import settings
+from app.agents.browser_pool import get_browser_pool
+from app.agents.crawl_profile import CrawlProfile
+from app.agents.extraction import extract_table
 
 OUTPUT_FILE = "registry/leaderboard.json"
 
+# Rank, model (usually a div or link), arena score, 95% CI (optional 4th column)
+TABLE_COLUMNS = [
+    [""],
+    ["div", "a", ""],
+    [""],
+    [""],
+]
+
 class LeaderboardCrawler:
     def __init__(self):
         self.url = "https://lmarena.ai/leaderboard/text"
         self.data = []
+        self.last_timings = {}
 
     def run(self):
         print(f"Starting Leaderboard Crawl: {self.url}")
+        profile = CrawlProfile()
+        self.last_timings = profile.timings
         
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                context = browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    viewport={"width": 1280, "height": 720}
-                )
-                page = context.new_page()
+            with get_browser_pool().page(
+                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+                viewport={"width": 1280, "height": 720}
+            ) as page:
+                profile.apply(page)
                 
                 try:
-                    page.goto(self.url, timeout=60000)
-                    # Wait for ANY table, which is the core content we need
-                    page.wait_for_selector('table', timeout=30000)
+                    with profile.phase("navigate"):
+                        page.goto(self.url, timeout=60000)
                     
-                    time.sleep(5) # Allow dynamic rows to hydrate
+                    # Wait for ANY table, which is the core content we need,
+                    # then for its dynamic rows to finish hydrating
+                    with profile.phase("ready"):
+                        page.wait_for_selector('table', timeout=30000)
+                        profile.wait_for_rows(page, "table tbody tr")
                     
-                    rows = page.query_selector_all("table tbody tr")
-                    print(f"Found {len(rows)} rows in the leaderboard.")
+                    with profile.phase("extract"):
+                        rows = extract_table(page, "table tbody tr", TABLE_COLUMNS, min_cells=3)
+                    print(f"Found {len(rows)} rows in the leaderboard ({profile.summary()}).")
                     
                     extracted_count = 0
-                    for row in rows:
-                        cells = row.query_selector_all("td")
-                        if len(cells) < 3:
-                            continue
-                            
-                        try:
-                            # Attempt to find the rank (usually first col)
-                            rank = cells[0].inner_text().strip()
-                            
-                            # Model name (usually second col, looks for a div or link)
-                            model_div = cells[1].query_selector("div") or cells[1].query_selector("a") or cells[1]
-                            model = model_div.inner_text().strip()
-                            
-                            # Score (usually 3rd col)
-                            score = cells[2].inner_text().strip()
-                            
-                            # CI (usually 4th col)
-                            ci = cells[3].inner_text().strip() if len(cells) > 3 else "-"
-                            
-                            self.data.append({
-                                "rank": rank,
-                                "model": model,
-                                "arena_score": score,
-                                "ci_95": ci,
-                                "category": "Overall"
-                            })
-                            extracted_count += 1
-                        except:
-                            continue
+                    for rank, model, score, ci in rows:
+                        self.data.append({
+                            "rank": rank,
+                            "model": model,
+                            "arena_score": score,
+                            "ci_95": ci if ci is not None else "-",
+                            "category": "Overall"
+                        })
+                        extracted_count += 1
                             
                     print(f"Extracted {extracted_count} entries.")
 
@@ -76,8 +70,6 @@ class LeaderboardCrawler:
                     print(f"Scraping error: {e}")
                     print("Attempting to use fallback/mock data due to scrape failure.")
                     self.use_fallback_data()
-                finally:
-                    browser.close()
 
         except Exception as e:
              print(f"Playwright error: {e}")
@@ -100,13 +92,10 @@ class LeaderboardCrawler:
     def save_data(self):
         print(f"Saving {len(self.data)} entries to Database...")
         try:
-            from app.storage.postgres import SessionLocal, clear_leaderboard, insert_leaderboard_entry
+            from app.storage.postgres import SessionLocal, replace_leaderboard
             db = SessionLocal()
             try:
-                clear_leaderboard(db)
-                for entry in self.data:
-                    insert_leaderboard_entry(db, entry)
-                db.commit()
+                replace_leaderboard(db, self.data)
                 print("Leaderboard saved to PostgreSQL.")
             finally:
                 db.close()
@@ -1,98 +1,105 @@
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Generator
 from app.agents.base import BaseAgent
-from playwright.sync_api import sync_playwright
+from app.agents.browser_pool import get_browser_pool
+from app.agents.crawl_profile import CrawlProfile
+from app.agents.extraction import extract_table
+
+# Provider, model, context window, input price, output price
+TABLE_COLUMNS = [
+    ["a span", "span", "a"],
+    ["a", ""],
+    ["span", ""],
+    ["span", ""],
+    ["span", ""],
+]
 
 class PriceCrawlerAgent(BaseAgent):
     """
     Scrapes real-time pricing from https://pricepertoken.com/
     """
+
+    def __init__(self, provider: str = "pricepertoken"):
+        super().__init__(provider)
+        self.last_timings: Dict[str, float] = {}
     
     def fetch(self) -> List[Dict[str, Any]]:
+        return list(self.iter_fetch())
+
+    def iter_fetch(self) -> Generator[Dict[str, Any], None, None]:
+        """
+        Yields the pricing rows one by one. The table is extracted in one
+        page.evaluate and fingerprinted as a whole first, so nothing is
+        yielded until the page has been fully scraped; publishing only
+        overlaps parsing, not the crawl.
+        """
         url = "https://pricepertoken.com/"
-        results = []
+        profile = CrawlProfile()
+        self.last_timings = profile.timings
+        
+        if self.source_not_modified(url):
+            print(f"{url} not modified since last run, skipping")
+            return
         
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                # Use a specific user agent to look more like a real browser
-                context = browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
-                )
-                page = context.new_page()
+            # Leased from the shared warm browser (default user agent looks like a real Chrome)
+            with get_browser_pool().page() as page:
+                profile.apply(page)
                 
                 # Increase timeout to 60s and wait for commit instead of networkidle which happens too late sometimes
                 try:
-                    page.goto(url, wait_until="domcontentloaded", timeout=60000)
-                    # wait a bit for dynamic content
-                    page.wait_for_timeout(5000) 
+                    with profile.phase("navigate"):
+                        page.goto(url, wait_until="domcontentloaded", timeout=60000)
                 except Exception as e:
                     print(f"Navigation error: {e}")
-                    browser.close()
-                    return []
+                    raise
                 
-                # Wait for the table to load
-                try:
-                    page.wait_for_selector("tbody tr", timeout=30000)
-                except Exception as e:
-                    print(f"Selector timeout: {e}")
+                # Wait for the table to load and stop growing
+                with profile.phase("ready"):
+                    try:
+                        page.wait_for_selector("tbody tr", timeout=30000)
+                        profile.wait_for_rows(page, "tbody tr")
+                    except Exception as e:
+                        print(f"Selector timeout: {e}")
                 
-                rows = page.query_selector_all("tbody tr")
-                print(f"Found {len(rows)} rows on {url}")
+                with profile.phase("extract"):
+                    rows = extract_table(page, "tbody tr", TABLE_COLUMNS, min_cells=5)
+                print(f"Found {len(rows)} rows on {url} ({profile.summary()})")
+
+                # Selector timeout or a challenge page: nothing to publish or record
+                if not rows:
+                    raise RuntimeError(f"No pricing rows found on {url}")
+                self.stage_validators(url)
+
+                if self.is_unchanged(url, rows):
+                    print("Price table unchanged since last run, skipping")
+                    return
                 
-                for row in rows:
+                for provider_text, model_text, context_text, input_text, output_text in rows:
                     try:
-                        # Extract cells
-                        cells = row.query_selector_all("td")
-                        if len(cells) < 5:
-                            continue
-                            
-                        # 1. Provider
-                        provider_elem = cells[0].query_selector("a span") or cells[0].query_selector("span") or cells[0].query_selector("a")
-                        provider_name = provider_elem.inner_text().strip() if provider_elem else "Unknown"
-                        
-                        # 2. Model
-                        model_elem = cells[1].query_selector("a") or cells[1]
-                        model_name = model_elem.inner_text().strip()
-                        
-                        # 3. Context Window
-                        context_elem = cells[2].query_selector("span") or cells[2]
-                        context_text = context_elem.inner_text().strip()
-                        context_window = self._parse_context(context_text)
-                        
-                        # 4. Input Price
-                        input_elem = cells[3].query_selector("span") or cells[3]
-                        input_price = self._parse_price(input_elem.inner_text())
-                        
-                        # 5. Output Price
-                        output_elem = cells[4].query_selector("span") or cells[4]
-                        output_price = self._parse_price(output_elem.inner_text())
-                        
                         # Construct standardized dict
                         entry = {
-                            "provider": provider_name.lower(),
-                            "model_name": model_name,
+                            "provider": (provider_text or "Unknown").lower(),
+                            "model_name": model_text,
                             "pricing": {
-                                "input": input_price,
-                                "output": output_price,
+                                "input": self._parse_price(input_text),
+                                "output": self._parse_price(output_text),
                                 "unit": "1M tokens" # Standard on this site
                             },
-                            "context_window": context_window,
+                            "context_window": self._parse_context(context_text),
                             "source": url
                         }
-                        results.append(entry)
+                        yield entry
                         
                     except Exception as e:
                         print(f"Error parsing row: {e}")
                         continue
-                        
-                browser.close()
                 
         except Exception as e:
             print(f"Failed to scrape {url}: {e}")
-            # Fallback strategy could go here
-            
-        return results
+            # Fallback strategy could go here. Re-raised so the run is reported
+            # as an error and records no fingerprint or validators
+            raise
 
     def _parse_price(self, price_str: str) -> float:
         """
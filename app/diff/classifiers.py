@@ -14,18 +14,48 @@ class ChangeType(str, Enum):
     NEW_MODEL = "new_model"
     UNKNOWN = "unknown"
 
-def classify_change(field: str, old_val: Any, new_val: Any) -> Dict[str, Any]:
+SEVERITY_ORDER = [Severity.LOW, Severity.MEDIUM, Severity.HIGH]
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def classify_change(path: str, old_val: Any, new_val: Any) -> Dict[str, Any]:
     """
-    Determines severity and change type based on field and values.
+    Determines severity and change type of a single leaf change.
+    `path` is the dotted path from SemanticDiff (e.g. pricing.input);
+    a bare field name classifies a whole-field change.
     """
+    field = path.split(".", 1)[0].split("[", 1)[0]
+    leaf = path.rsplit(".", 1)[-1]
+
     if field == "pricing":
-        # Any pricing change is at least medium, could be high
+        # A unit change silently rescales every price
+        if leaf == "unit":
+            return {"severity": Severity.HIGH, "type": ChangeType.PRICING_CHANGE, "breaking": True}
+        if _is_number(old_val) and _is_number(new_val):
+            if new_val > old_val:
+                return {"severity": Severity.HIGH, "type": ChangeType.PRICING_CHANGE, "direction": "increase"}
+            return {"severity": Severity.MEDIUM, "type": ChangeType.PRICING_CHANGE, "direction": "decrease"}
+        # Any other pricing change is at least medium
         return {"severity": Severity.MEDIUM, "type": ChangeType.PRICING_CHANGE}
     
     if field == "context_window":
-        if isinstance(new_val, (int, float)) and isinstance(old_val, (int, float)):
+        if _is_number(new_val) and _is_number(old_val):
             if new_val < old_val:
                 return {"severity": Severity.HIGH, "type": ChangeType.LIMIT_CHANGE, "breaking": True}
         return {"severity": Severity.LOW, "type": ChangeType.LIMIT_CHANGE}
 
+    if field == "rate_limits":
+        if _is_number(new_val) and _is_number(old_val) and new_val < old_val:
+            return {"severity": Severity.MEDIUM, "type": ChangeType.LIMIT_CHANGE}
+        return {"severity": Severity.LOW, "type": ChangeType.LIMIT_CHANGE}
+
+    if field == "capabilities":
+        old_items = set(map(str, old_val)) if isinstance(old_val, list) else set()
+        new_items = set(map(str, new_val)) if isinstance(new_val, list) else set()
+        # Removed keys / list items, or a flag going truthy -> falsy (capabilities.vision: True -> False)
+        if (old_val and not new_val) or old_items - new_items:
+            return {"severity": Severity.HIGH, "type": ChangeType.CAPABILITY_REMOVED, "breaking": True}
+        return {"severity": Severity.LOW, "type": ChangeType.CAPABILITY_ADDED}
+
     return {"severity": Severity.LOW, "type": ChangeType.UNKNOWN}
@@ -1,13 +1,35 @@
-from typing import Dict, Any, List, Optional
-from app.models.registry import RegistryEntryData, ModelFields
-from app.diff.classifiers import classify_change, Severity
+import math
+from typing import Dict, Any, List, Optional, Union
+from app.config import settings
+from app.models.registry import RegistryEntryData, ModelFields, EntryRecord
+from app.diff.classifiers import classify_change, Severity, SEVERITY_ORDER
+
+Entry = Union[RegistryEntryData, EntryRecord]
+
+def _field_dicts(entry: Entry) -> Dict[str, Any]:
+    if isinstance(entry, EntryRecord):
+        # Already plain dicts, no dump needed
+        return entry.fields
+    return entry.fields.model_dump(exclude_unset=True)
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
 
 class SemanticDiff:
     """
-    Compares two RegistryEntryData objects to detect semantic changes.
+    Compares two RegistryEntryData objects (or EntryRecords) to detect semantic changes.
+
+    Field values are compared recursively and reported per leaf with a
+    dotted path (pricing.input, rate_limits.tiers[2].rpm). Equal subtrees
+    are skipped without descending, and numbers within rel_tol / abs_tol
+    of each other are treated as equal.
     """
+
+    def __init__(self, rel_tol: Optional[float] = None, abs_tol: Optional[float] = None):
+        self.rel_tol = rel_tol if rel_tol is not None else settings.DIFF_REL_TOLERANCE
+        self.abs_tol = abs_tol if abs_tol is not None else settings.DIFF_ABS_TOLERANCE
     
-    def compute_diff(self, old_entry: Optional[RegistryEntryData], new_entry: RegistryEntryData) -> Dict[str, Any]:
+    def compute_diff(self, old_entry: Optional[Entry], new_entry: Entry) -> Dict[str, Any]:
         """
         Returns a diff dictionary.
         If old_entry is None, it's a new model.
@@ -22,34 +44,75 @@ class SemanticDiff:
         changes = []
         
         # Compare fields
-        new_fields = new_entry.fields.model_dump(exclude_unset=True)
-        old_fields = old_entry.fields.model_dump(exclude_unset=True)
+        new_fields = _field_dicts(new_entry)
+        old_fields = _field_dicts(old_entry)
+        # Per-field digests (EntryRecord only) let equal fields be skipped outright
+        new_digests = getattr(new_entry, "digests", None) or {}
+        old_digests = getattr(old_entry, "digests", None) or {}
         
         for field_name, new_meta in new_fields.items():
+            if new_meta is None:
+                continue
+            if field_name in old_digests and old_digests[field_name] == new_digests.get(field_name):
+                continue
             old_meta = old_fields.get(field_name)
             
             if not old_meta:
                  changes.append({
                     "field": field_name,
+                    "path": field_name,
                     "action": "added",
                     "value": new_meta["value"],
                     "severity": Severity.LOW
                 })
                  continue
 
-            if new_meta["value"] != old_meta["value"]:
-                classification = classify_change(field_name, old_meta["value"], new_meta["value"])
-                changes.append({
-                    "field": field_name,
-                    "action": "modified",
-                    "old_value": old_meta["value"],
-                    "new_value": new_meta["value"],
-                    **classification
-                })
+            self._diff_value(field_name, field_name, old_meta["value"], new_meta["value"], changes)
         
         return {
             "type": "update",
+            "severity": max((c["severity"] for c in changes), key=SEVERITY_ORDER.index, default=Severity.LOW),
             "changes": changes,
             "provider": new_entry.provider,
             "model": new_entry.model
         }
+
+    def _diff_value(self, field: str, path: str, old: Any, new: Any, changes: List[Dict[str, Any]]):
+        # Identical subtree: nothing below it can differ
+        if old == new:
+            return
+
+        if isinstance(old, dict) and isinstance(new, dict):
+            for key, new_child in new.items():
+                child_path = f"{path}.{key}"
+                if key not in old:
+                    changes.append(self._change(field, child_path, "added", None, new_child))
+                else:
+                    self._diff_value(field, child_path, old[key], new_child, changes)
+            for key, old_child in old.items():
+                if key not in new:
+                    changes.append(self._change(field, f"{path}.{key}", "removed", old_child, None))
+            return
+
+        # Same-length lists of objects (tiers, ...) are compared positionally;
+        # scalar lists (capabilities) and resized lists are a single leaf
+        if (isinstance(old, list) and isinstance(new, list) and len(old) == len(new)
+                and all(isinstance(item, (dict, list)) for item in old + new)):
+            for index, (old_item, new_item) in enumerate(zip(old, new)):
+                self._diff_value(field, f"{path}[{index}]", old_item, new_item, changes)
+            return
+
+        if _is_number(old) and _is_number(new) and math.isclose(old, new, rel_tol=self.rel_tol, abs_tol=self.abs_tol):
+            return
+
+        changes.append(self._change(field, path, "modified", old, new))
+
+    def _change(self, field: str, path: str, action: str, old: Any, new: Any) -> Dict[str, Any]:
+        return {
+            "field": field,
+            "path": path,
+            "action": action,
+            "old_value": old,
+            "new_value": new,
+            **classify_change(path, old, new)
+        }
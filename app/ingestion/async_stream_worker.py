@@ -0,0 +1,285 @@
+import asyncio
+import time
+from typing import Optional, List, Tuple, Dict, Any, Set
+from sqlalchemy import select
+from app.config import settings
+from app.storage.redis import get_async_redis
+from app.storage.postgres_async import AsyncSessionLocal
+from app.storage.postgres import model_upsert_statements, flatten_registry_entry
+from app.models.registry import RegistryEntry, EntryRecord
+from app.models.history import HistoryEntry
+from app.ingestion.normalizer import Normalizer
+from app.ingestion.state_manager import ENTRY_HASHES_KEY, ENTRY_VERSIONS_KEY, entry_hash_field, is_newer_version
+from app.ingestion.dead_letter import DeadLetterQueue
+from app.ingestion.metrics import WorkerMetrics
+from app.ingestion.stream_worker import (
+    STREAM_KEY, CONSUMER_GROUP, decode_message, read_trace, message_version, load_entry_data, default_consumer_name,
+    ensure_partitions, record_freshness, collect_stream_stats
+)
+from app.diff.semantic_diff import SemanticDiff
+from app.utils.hashing import compute_entry_digests, stored_digests
+
+class AsyncStreamWorker:
+    """
+    asyncio counterpart of StreamWorker built on redis.asyncio and an async
+    SQLAlchemy engine. Up to `concurrency` messages are in flight at once;
+    messages for the same (provider, model) are applied one at a time in
+    stream order. Exports the same metrics as StreamWorker; stage latencies
+    are wall time, so they include time spent waiting on other messages.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, consumer_name: Optional[str] = None):
+        self.redis = get_async_redis()
+        self.consumer_name = consumer_name or default_consumer_name()
+        self.normalizer = Normalizer()
+        self.diff_engine = SemanticDiff()
+        # Failure bookkeeping is rare, so the sync helper runs in a thread
+        self.dead_letters = DeadLetterQueue(STREAM_KEY, CONSUMER_GROUP)
+        self.concurrency = concurrency or settings.WORKER_ASYNC_CONCURRENCY
+        self.claim_interval = settings.WORKER_CLAIM_INTERVAL
+        self.claim_min_idle_ms = settings.WORKER_CLAIM_MIN_IDLE_MS
+        self._last_claim = 0.0
+        self._tasks: Set[asyncio.Task] = set()
+        # Per-model locks keep ordering; dropped once nobody is waiting on them
+        self._key_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._key_refs: Dict[Tuple[str, str], int] = {}
+        # Newest dispatched (message id, version) per model, used to coalesce queued updates
+        self.coalesce = settings.WORKER_COALESCE
+        self._latest: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        # Gauges are collected and published with the sync client, off the loop
+        self.metrics = WorkerMetrics(labels={"consumer": self.consumer_name})
+        self.metrics.add_collector(lambda metrics: collect_stream_stats(self.dead_letters.redis, metrics))
+        self._last_metrics_publish = 0.0
+
+    async def setup_stream(self):
+        try:
+            await self.redis.xgroup_create(STREAM_KEY, CONSUMER_GROUP, id="0", mkstream=True)
+            print(f"Created consumer group {CONSUMER_GROUP}")
+        except Exception as e:
+            if "BUSYGROUP" in str(e):
+                pass
+            else:
+                print(f"Error creating consumer group: {e}")
+
+    def dispatch(self, rows: List[Tuple[str, Dict[str, Any]]]):
+        """
+        Starts one task per message. Tasks are created in stream order,
+        which is the order they queue up on their model's lock.
+        """
+        dequeued_at = time.time()
+        for message_id, message_data in rows:
+            try:
+                new_entry_data = decode_message(self.normalizer, message_data, self.metrics)
+                if new_entry_data is None:
+                    raise ValueError("Message has no payload")
+            except Exception as e:
+                print(f"Error processing message {message_id}: {e}")
+                self.metrics.inc("messages_failed")
+                self._spawn(asyncio.to_thread(self.dead_letters.record_failure, [message_id], e))
+                continue
+
+            key = (new_entry_data.provider, new_entry_data.model)
+            version = message_version(message_id, message_data)
+            # A late replay of an older update must not supersede a queued newer one
+            latest = self._latest.get(key)
+            if latest is None or is_newer_version(version, latest[1]):
+                self._latest[key] = (message_id, version)
+            # Counted here, not when the task first runs, so a finishing task
+            # never drops the lock or marker of one that is dispatched but not started
+            self._key_locks.setdefault(key, asyncio.Lock())
+            self._key_refs[key] = self._key_refs.get(key, 0) + 1
+            self._spawn(self._process_in_order(message_id, new_entry_data, read_trace(message_data, dequeued_at), version))
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _process_in_order(self, message_id: str, new_entry_data: EntryRecord, trace: Optional[Dict[str, Any]] = None, version: Optional[str] = None):
+        """
+        Runs a message dispatched by dispatch(), which registered it in
+        _key_locks / _key_refs / _latest.
+        """
+        key = (new_entry_data.provider, new_entry_data.model)
+        try:
+            async with self._key_locks[key]:
+                if self.coalesce and self._latest.get(key, (None,))[0] != message_id:
+                    # A newer update for this model is queued behind us
+                    await self._ack(message_id)
+                    self.metrics.inc("messages_processed")
+                else:
+                    await self.process_message(message_id, new_entry_data, trace, version)
+        finally:
+            if self._latest.get(key, (None,))[0] == message_id:
+                del self._latest[key]
+            self._key_refs[key] -= 1
+            if not self._key_refs[key]:
+                del self._key_refs[key]
+                del self._key_locks[key]
+
+    async def process_message(self, message_id: str, new_entry_data: EntryRecord, trace: Optional[Dict[str, Any]] = None, version: Optional[str] = None):
+        version = version or message_id
+        try:
+            field = entry_hash_field(new_entry_data.provider, new_entry_data.model)
+
+            # Unchanged since the last commit: skip the DB read and the diff
+            with self.metrics.stage("hash"):
+                entry_hash, new_entry_data.digests = compute_entry_digests(new_entry_data.to_dict())
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.hget(ENTRY_HASHES_KEY, field)
+                pipe.hget(ENTRY_VERSIONS_KEY, field)
+                stored_hash, applied = await pipe.execute()
+            if not is_newer_version(version, applied):
+                # Older than the update already applied (reclaimed or replayed late)
+                print(f"Skipping {message_id} (version {version}): {field} already has {applied}")
+                self.metrics.inc("messages_stale")
+            elif stored_hash == entry_hash:
+                self.metrics.inc("messages_unchanged")
+                await self.redis.hset(ENTRY_VERSIONS_KEY, field, version)
+            else:
+                await self._save_to_db(new_entry_data, trace)
+                pipe = self.redis.pipeline(transaction=True)
+                pipe.hset(ENTRY_HASHES_KEY, field, entry_hash)
+                pipe.hset(ENTRY_VERSIONS_KEY, field, version)
+                await pipe.execute()
+
+            await self._ack(message_id)
+            self.metrics.inc("messages_processed")
+        except Exception as e:
+            print(f"Error processing message {message_id}: {e}")
+            self.metrics.inc("messages_failed")
+            await asyncio.to_thread(self.dead_letters.record_failure, [message_id], e)
+
+    async def _ack(self, message_id: str):
+        with self.metrics.stage("xack"):
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.xack(STREAM_KEY, CONSUMER_GROUP, message_id)
+            pipe.hdel(self.dead_letters.errors_key, message_id)
+            await pipe.execute()
+
+    async def _save_to_db(self, new_entry_data: EntryRecord, trace: Optional[Dict[str, Any]] = None):
+        async with AsyncSessionLocal() as db:
+            try:
+                with self.metrics.stage("db_load"):
+                    result = await db.execute(
+                        select(RegistryEntry).filter_by(
+                            provider=new_entry_data.provider,
+                            model=new_entry_data.model
+                        )
+                    )
+                    existing_entry_db = result.scalars().first()
+                    old_entry_data = load_entry_data(existing_entry_db.data, existing_entry_db.digests) if existing_entry_db else None
+
+                with self.metrics.stage("diff"):
+                    diff = self.diff_engine.compute_diff(old_entry_data, new_entry_data)
+                if diff["type"] != "new_model" and not diff["changes"]:
+                    return
+
+                print(f"Update: {new_entry_data.provider}/{new_entry_data.model}")
+                with self.metrics.stage("db_write"):
+                    entry_dict = new_entry_data.to_dict()
+                    digests = stored_digests(new_entry_data.digests) if new_entry_data.digests else None
+
+                    if not existing_entry_db:
+                        existing_entry_db = RegistryEntry(
+                            provider=new_entry_data.provider,
+                            model=new_entry_data.model
+                        )
+                        db.add(existing_entry_db)
+                    existing_entry_db.set_data(entry_dict, digests)
+
+                    db.add(HistoryEntry(
+                        provider=new_entry_data.provider,
+                        model=new_entry_data.model,
+                        diff=diff,
+                        snapshot=entry_dict,
+                        trace_id=trace["trace_id"] if trace else None
+                    ))
+
+                    # Keep the flattened models projection in the same transaction
+                    model_row = flatten_registry_entry(entry_dict)
+                    if model_row:
+                        for stmt in model_upsert_statements(db, [model_row]):
+                            await db.execute(stmt)
+                    await db.commit()
+                self.metrics.inc("entries_written")
+                record_freshness(self.metrics, trace, time.time())
+
+            except Exception as e:
+                print(f"DB Error: {e}")
+                await db.rollback()
+                raise
+
+    async def claim_stale_messages(self) -> int:
+        """
+        Same reclaim as StreamWorker.claim_stale_messages: takes over
+        messages idle on any consumer for longer than claim_min_idle_ms.
+        """
+        claimed = 0
+        start_id = "0-0"
+        while True:
+            result = await self.redis.xautoclaim(
+                STREAM_KEY, CONSUMER_GROUP, self.consumer_name,
+                min_idle_time=self.claim_min_idle_ms,
+                start_id=start_id,
+                count=self.concurrency
+            )
+            start_id, rows = result[0], result[1]
+            rows = [(message_id, data) for message_id, data in rows if data]
+            rows = await asyncio.to_thread(self.dead_letters.filter_exhausted, rows)
+            if rows:
+                claimed += len(rows)
+                self.dispatch(rows)
+            if start_id == "0-0":
+                break
+
+        if claimed:
+            print(f"{self.consumer_name} reclaimed {claimed} pending messages")
+        return claimed
+
+    async def publish_metrics(self, force: bool = False):
+        """
+        Same as StreamWorker.publish_metrics, in a thread so collecting
+        gauges does not block the loop.
+        """
+        if not settings.WORKER_METRICS_REDIS:
+            return
+        if not force and time.monotonic() - self._last_metrics_publish < settings.WORKER_METRICS_INTERVAL:
+            return
+        self._last_metrics_publish = time.monotonic()
+        key = f"metrics:worker:{self.consumer_name}"
+        await asyncio.to_thread(self.metrics.publish, self.dead_letters.redis, key, settings.WORKER_METRICS_INTERVAL * 3)
+
+    async def run(self, metrics_port: Optional[int] = None):
+        await self.setup_stream()
+        metrics_port = metrics_port if metrics_port is not None else settings.WORKER_METRICS_PORT
+        if metrics_port:
+            self.metrics.serve(metrics_port)
+        await asyncio.to_thread(ensure_partitions)
+        print(f"Async worker {self.consumer_name} listening on {STREAM_KEY} (concurrency {self.concurrency})...")
+        while True:
+            try:
+                await self.publish_metrics()
+                if time.monotonic() - self._last_claim >= self.claim_interval:
+                    self._last_claim = time.monotonic()
+                    await self.claim_stale_messages()
+                    await asyncio.to_thread(self.dead_letters.trim_stream)
+
+                free = self.concurrency - len(self._tasks)
+                if free <= 0:
+                    await asyncio.wait(self._tasks, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
+                # Block for 5 seconds waiting for new messages
+                messages = await self.redis.xreadgroup(CONSUMER_GROUP, self.consumer_name, {STREAM_KEY: ">"}, count=free, block=5000)
+
+                if not messages:
+                    continue
+
+                for stream, rows in messages:
+                    self.metrics.inc("messages_received", len(rows))
+                    self.dispatch(rows)
+
+            except Exception as e:
+                print(f"Worker loop error: {e}")
+                await asyncio.sleep(1)
@@ -0,0 +1,137 @@
+import time
+from typing import Optional, List, Tuple, Dict, Any
+from app.config import settings
+from app.storage.redis import get_redis
+from app.utils.timestamps import get_current_timestamp
+from app.ingestion.state_manager import parse_stream_id
+
+class DeadLetterQueue:
+    """
+    Failure bookkeeping and retention for a consumer-group stream.
+
+    Workers record the error of every failed message in <stream>:errors.
+    When a reclaimed message has been delivered more than max_deliveries
+    times (per XPENDING), it is moved to <stream>:dlq together with its
+    last error. Acknowledged messages are trimmed from the stream by age.
+    """
+
+    def __init__(self, stream_key: str, consumer_group: str, max_deliveries: Optional[int] = None):
+        self.redis = get_redis()
+        self.stream_key = stream_key
+        self.consumer_group = consumer_group
+        self.dlq_key = f"{stream_key}:dlq"
+        # Last processing error per pending message id
+        self.errors_key = f"{stream_key}:errors"
+        self.max_deliveries = max_deliveries or settings.WORKER_MAX_DELIVERIES
+
+    def record_failure(self, message_ids: List[str], error: Any):
+        if message_ids:
+            self.redis.hset(self.errors_key, mapping={message_id: str(error) for message_id in message_ids})
+
+    def delivery_counts(self, message_ids: List[str]) -> Dict[str, int]:
+        pipe = self.redis.pipeline(transaction=False)
+        for message_id in message_ids:
+            pipe.xpending_range(self.stream_key, self.consumer_group, min=message_id, max=message_id, count=1)
+        counts = {}
+        for message_id, pending in zip(message_ids, pipe.execute()):
+            counts[message_id] = pending[0]["times_delivered"] if pending else 0
+        return counts
+
+    def filter_exhausted(self, rows: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Dead-letters reclaimed rows that ran out of retries and returns the rest.
+        """
+        if not rows:
+            return rows
+        counts = self.delivery_counts([message_id for message_id, _ in rows])
+        retry = []
+        for message_id, message_data in rows:
+            if counts.get(message_id, 0) > self.max_deliveries:
+                self.dead_letter(message_id, message_data, counts[message_id])
+            else:
+                retry.append((message_id, message_data))
+        return retry
+
+    def dead_letter(self, message_id: str, message_data: Dict[str, Any], deliveries: int):
+        error = self.redis.hget(self.errors_key, message_id) or "unknown"
+        print(f"Dead-lettering {message_id} after {deliveries} deliveries: {error}")
+
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.xadd(self.dlq_key, {
+            "payload": message_data.get("payload", ""),
+            "trace_id": message_data.get("trace_id", ""),
+            "error": error,
+            "message_id": message_id,
+            # Stream id the worker orders this update by, kept across replays
+            "origin_id": message_data.get("origin_id") or message_id,
+            "deliveries": deliveries,
+            "failed_at": get_current_timestamp()
+        }, maxlen=settings.DLQ_MAXLEN, approximate=True)
+        pipe.xack(self.stream_key, self.consumer_group, message_id)
+        pipe.xdel(self.stream_key, message_id)
+        pipe.hdel(self.errors_key, message_id)
+        pipe.execute()
+
+    def trim_stream(self, retention_seconds: Optional[int] = None) -> int:
+        """
+        Trims messages older than retention_seconds from the main stream.
+        Never goes past the oldest pending message or the group's
+        last-delivered id, so unprocessed messages are kept.
+        Returns the number of entries removed.
+        """
+        retention_seconds = retention_seconds if retention_seconds is not None else settings.STREAM_RETENTION_SECONDS
+        if not retention_seconds:
+            return 0
+
+        cutoff = (int(time.time() * 1000) - retention_seconds * 1000, 0)
+        bounds = [cutoff]
+
+        group = next((g for g in self.redis.xinfo_groups(self.stream_key) if g["name"] == self.consumer_group), None)
+        if group is None:
+            return 0
+        bounds.append(parse_stream_id(group["last-delivered-id"]))
+
+        pending = self.redis.xpending(self.stream_key, self.consumer_group)
+        if pending["pending"]:
+            bounds.append(parse_stream_id(pending["min"]))
+
+        ms, seq = min(bounds)
+        return self.redis.xtrim(self.stream_key, minid=f"{ms}-{seq}", approximate=True)
+
+    # --- DLQ inspection / replay ---
+
+    def entries(self, count: int = 100) -> List[Tuple[str, Dict[str, Any]]]:
+        return self.redis.xrange(self.dlq_key, count=count)
+
+    def replay(self, dlq_ids: Optional[List[str]] = None) -> int:
+        """
+        Re-publishes dead-lettered payloads to the main stream and removes
+        them from the DLQ. Replays everything when dlq_ids is None.
+        """
+        rows = self._select(dlq_ids)
+        for dlq_id, data in rows:
+            pipe = self.redis.pipeline(transaction=True)
+            # Keep the original stream id, so the worker does not apply the
+            # replay over a newer update of the same model
+            fields = {"payload": data.get("payload", ""), "origin_id": data.get("origin_id") or data.get("message_id", "")}
+            # Keep the trace id; the original timings are not carried over
+            if data.get("trace_id"):
+                fields["trace_id"] = data["trace_id"]
+            pipe.xadd(self.stream_key, fields)
+            pipe.xdel(self.dlq_key, dlq_id)
+            pipe.execute()
+        return len(rows)
+
+    def purge(self, dlq_ids: Optional[List[str]] = None) -> int:
+        rows = self._select(dlq_ids)
+        if rows:
+            self.redis.xdel(self.dlq_key, *[dlq_id for dlq_id, _ in rows])
+        return len(rows)
+
+    def _select(self, dlq_ids: Optional[List[str]]) -> List[Tuple[str, Dict[str, Any]]]:
+        if dlq_ids is None:
+            return self.redis.xrange(self.dlq_key)
+        rows = []
+        for dlq_id in dlq_ids:
+            rows.extend(self.redis.xrange(self.dlq_key, min=dlq_id, max=dlq_id))
+        return rows
@@ -0,0 +1,172 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Upper bounds in seconds, from sub-millisecond hash checks to slow DB commits
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# End-to-end latencies, from sub-second updates to a full crawl behind a backlog
+FRESHNESS_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus sense.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Upper bound of the bucket holding the q-th observation.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+class WorkerMetrics:
+    """
+    In-process metrics for a stream worker: per-stage latency histograms,
+    counters and gauges. Rendered in the Prometheus text format, which is
+    served over HTTP by serve() and/or mirrored into a Redis hash by
+    publish().
+    """
+
+    def __init__(self, prefix: str = "ingestion_worker", labels: Optional[Dict[str, str]] = None):
+        self.prefix = prefix
+        self.labels = labels or {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        # Refreshes gauges (lag, pending) right before rendering
+        self._collectors: List[Callable[["WorkerMetrics"], None]] = []
+        self._server = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Times the enclosed block into the stage latency histogram.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=name)
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **labels):
+        """
+        Adds a value (seconds) to a histogram; buckets only apply on first use.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def add_collector(self, collector: Callable[["WorkerMetrics"], None]):
+        self._collectors.append(collector)
+
+    def collect(self):
+        for collector in self._collectors:
+            try:
+                collector(self)
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+
+    # --- Exposition ---
+
+    def _labels(self, **extra) -> str:
+        labels = {**self.labels, **extra}
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+    def samples(self) -> List[Tuple[str, float]]:
+        """
+        Flat (sample name, value) pairs in exposition order.
+        """
+        self.collect()
+        p = self.prefix
+        samples = [(f"{p}_uptime_seconds{self._labels()}", round(time.time() - self.started_at, 3))]
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                samples.append((f"{p}_{name}_total{self._labels()}", value))
+            for name, value in sorted(self._gauges.items()):
+                samples.append((f"{p}_{name}{self._labels()}", value))
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                labels = dict(labels)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    samples.append((f"{p}_{name}_bucket{self._labels(**labels, le=bound)}", cumulative))
+                samples.append((f"{p}_{name}_bucket{self._labels(**labels, le='+Inf')}", histogram.count))
+                samples.append((f"{p}_{name}_sum{self._labels(**labels)}", round(histogram.sum, 6)))
+                samples.append((f"{p}_{name}_count{self._labels(**labels)}", histogram.count))
+        return samples
+
+    def render(self) -> str:
+        return "".join(f"{name} {value}\n" for name, value in self.samples())
+
+    def publish(self, redis_client, key: str, ttl: int = 300):
+        """
+        Mirrors the current samples into a Redis hash that expires if the
+        worker stops publishing.
+        """
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.hset(key, mapping={name: value for name, value in self.samples()})
+        pipe.expire(key, ttl)
+        pipe.execute()
+
+    def serve(self, port: int, host: str = "0.0.0.0"):
+        """
+        Serves render() at /metrics from a daemon thread.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"Metrics available on http://{host}:{port}/metrics")
+        return self._server
@@ -1,5 +1,5 @@
-from typing import Dict, Any, List
-from app.models.registry import RegistryEntryData, ModelFields, FieldMetadata, Conflict
+from typing import Dict, Any, List, Optional
+from app.models.registry import RegistryEntryData, ModelFields, Conflict, EntryRecord, STANDARD_FIELDS
 from app.utils.timestamps import get_current_timestamp
 
 class Normalizer:
@@ -7,44 +7,58 @@ class Normalizer:
     Normalizes raw data from agents into the standard RegistryEntryData format.
     Ensures every field has metadata.
     """
-    
+
     def normalize(self, raw_data: Dict[str, Any], provider: str) -> RegistryEntryData:
+        record = self.normalize_record(raw_data, provider)
+        fields = ModelFields(**{name: meta for name, meta in record.fields.items() if meta is not None})
+        return RegistryEntryData(
+            provider=record.provider,
+            model=record.model,
+            fields=fields
+        )
+
+    def normalize_record(self, raw_data: Dict[str, Any], provider: str) -> EntryRecord:
+        """
+        Same mapping as normalize(), producing an EntryRecord without building
+        pydantic models. This is the trust boundary for stream payloads: the
+        typed parts of the payload are checked here (field values are Any in
+        the schema) and nothing downstream validates the record again.
+        """
         # Basic normalization strategy
         model_name = raw_data.get("model_name") or raw_data.get("id")
         if not model_name:
             # Fallback or error
             model_name = "unknown-model"
 
-        # Construct fields
-        # This mapping depends heavily on the source structure. 
+        # This mapping depends heavily on the source structure.
         # For MVP, we stick to the example structure used in ProviderCrawlerAgent
-        
-        fields = ModelFields()
         timestamp = get_current_timestamp()
         source = raw_data.get("source", "unknown")
-        
+        _require_str("provider", provider)
+        _require_str("model_name", model_name)
+        _require_str("source", source)
+
+        fields: Dict[str, Optional[Dict[str, Any]]] = dict.fromkeys(STANDARD_FIELDS)
         if "pricing" in raw_data:
-            fields.pricing = FieldMetadata(
-                value=raw_data["pricing"],
-                sources=[source],
-                last_verified=timestamp,
-                confidence=0.9,
-                conflicts=[]
-            )
-            
+            fields["pricing"] = _field(raw_data["pricing"], source, timestamp)
+
         if "context_window" in raw_data:
-             fields.context_window = FieldMetadata(
-                value=raw_data["context_window"],
-                sources=[source],
-                last_verified=timestamp,
-                confidence=0.9,
-                conflicts=[]
-             )
-             
+            fields["context_window"] = _field(raw_data["context_window"], source, timestamp)
+
         # Normalize other fields...
 
-        return RegistryEntryData(
-            provider=provider,
-            model=model_name,
-            fields=fields
-        )
+        return EntryRecord(provider, model_name, fields)
+
+def _require_str(name: str, value: Any):
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid payload: {name} must be a string, got {type(value).__name__}")
+
+def _field(value: Any, source: str, timestamp: str) -> Dict[str, Any]:
+    # Serialized FieldMetadata
+    return {
+        "value": value,
+        "sources": [source],
+        "last_verified": timestamp,
+        "confidence": 0.9,
+        "conflicts": []
+    }
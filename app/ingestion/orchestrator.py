@@ -1,6 +1,12 @@
-from typing import List, Optional
+from typing import List, Optional, Dict, Any
+from concurrent.futures import Future, wait, FIRST_COMPLETED
 import json
 import os
+import queue
+import threading
+import time
+from pydantic import BaseModel
+from app.config import settings
 from sqlalchemy.orm import Session
 from app.agents.base import BaseAgent
 from app.ingestion.normalizer import Normalizer
@@ -11,27 +17,210 @@ from app.storage.postgres import SessionLocal
 from app.models.registry import RegistryEntry, RegistryEntryData
 from app.models.history import HistoryEntry  # Added import
 
+# Marks the end of an agent's stream in the publish buffer
+_END_OF_STREAM = object()
+
+class AgentRunResult(BaseModel):
+    """
+    Outcome of one agent in run_agents().
+    status is one of: ok, error, timeout, cancelled.
+    """
+    agent: str
+    provider: str
+    status: str = "ok"
+    items: int = 0
+    duration: float = 0.0
+    error: Optional[str] = None
+
 class IngestionOrchestrator:
     def __init__(self):
         self.normalizer = Normalizer()
         self.state_manager = StateManager()
         self.diff_engine = SemanticDiff()
 
-    def run_agent(self, agent: BaseAgent):
+    def run_agent(
+        self,
+        agent: BaseAgent,
+        pipelined: bool = True,
+        streaming: bool = True,
+        cancel: Optional[threading.Event] = None,
+        progress: Optional[Dict[str, Any]] = None
+    ) -> int:
         """
         Triggers the agent to fetch data and push it to the stream.
+        By default items are consumed from agent.iter_fetch() and published
+        while the agent is still scraping; with streaming=False the full
+        fetch() result is published at the end.
+        Setting `cancel` stops a streaming run after the current item.
+        Returns the number of items pushed.
         """
         print(f"Triggering agent for {agent.provider}...")
+        agent.mark_crawl_start()
+        if streaming and pipelined:
+            count = self._stream_agent(agent, cancel, progress)
+            print(f"Pushed {count} items to stream for {agent.provider}")
+            return count
+
         raw_items = agent.fetch()
         
-        count = 0
-        for item in raw_items:
-            # Push normalized-ready data to stream
-            agent.push_to_stream(item)
-            count += 1
+        # Push normalized-ready data to stream
+        if pipelined:
+            count = agent.push_many(raw_items)
+        else:
+            count = 0
+            for item in raw_items:
+                agent.push_to_stream(item)
+                count += 1
+        agent.commit_state()
             
         print(f"Pushed {count} items to stream for {agent.provider}")
+        return count
+
+    def run_agents(
+        self,
+        agents: List[BaseAgent],
+        timeout: Optional[float] = None,
+        max_workers: Optional[int] = None
+    ) -> List[AgentRunResult]:
+        """
+        Runs several agents concurrently (at most max_workers at a time), so
+        a run takes as long as the slowest agent rather than the sum of all
+        of them.
+
+        Each agent gets `agent.timeout` seconds if set, otherwise `timeout`.
+        A timed-out agent is asked to stop (cooperatively, after its current
+        item) and reported right away instead of being waited for. Agents run
+        in daemon threads, so one stuck inside a blocking call does not keep
+        the interpreter from exiting either.
+        Returns one AgentRunResult per agent, in input order.
+        """
+        if not agents:
+            return []
+
+        results: Dict[int, AgentRunResult] = {}
+        runs = {}
+        slots = threading.BoundedSemaphore(max_workers or len(agents))
+
+        def run_one(agent: BaseAgent, run: Dict[str, Any], future: Future):
+            with slots:
+                # Not started before the run was interrupted
+                if run["cancel"].is_set() or not future.set_running_or_notify_cancel():
+                    return
+                run["started"] = time.monotonic()
+                try:
+                    future.set_result(self.run_agent(agent, cancel=run["cancel"], progress=run))
+                except BaseException as e:
+                    future.set_exception(e)
+
+        for index, agent in enumerate(agents):
+            run = {"cancel": threading.Event(), "started": None, "count": 0}
+            future = Future()
+            runs[future] = (index, agent, run)
+            threading.Thread(target=run_one, args=(agent, run, future), name=f"agent-{agent.provider}", daemon=True).start()
+
+        def finish(future, status: str, error: Optional[str] = None, items: Optional[int] = None):
+            index, agent, run = runs[future]
+            started = run["started"] or time.monotonic()
+            results[index] = AgentRunResult(
+                agent=type(agent).__name__,
+                provider=agent.provider,
+                status=status,
+                items=items if items is not None else run["count"],
+                duration=round(time.monotonic() - started, 3),
+                error=error
+            )
+
+        pending = set(runs)
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        status = "cancelled" if runs[future][2]["cancel"].is_set() else "ok"
+                        finish(future, status, items=future.result())
+                    except Exception as e:
+                        finish(future, "error", error=str(e))
+
+                now = time.monotonic()
+                for future in list(pending):
+                    index, agent, run = runs[future]
+                    agent_timeout = agent.timeout or timeout
+                    if agent_timeout and run["started"] and now - run["started"] > agent_timeout:
+                        run["cancel"].set()
+                        pending.discard(future)
+                        finish(future, "timeout", error=f"Timed out after {agent_timeout}s")
+        except KeyboardInterrupt:
+            for future in pending:
+                runs[future][2]["cancel"].set()
+                finish(future, "cancelled")
+            raise
+
+        for result in results.values():
+            print(f"{result.agent}[{result.provider}]: {result.status}, {result.items} items in {result.duration}s"
+                  + (f" ({result.error})" if result.error else ""))
+        return [results[i] for i in range(len(agents))]
             
+    def _stream_agent(
+        self,
+        agent: BaseAgent,
+        cancel: Optional[threading.Event] = None,
+        progress: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """
+        Runs agent.iter_fetch() on the calling thread and hands items to a
+        publisher thread through a bounded buffer. The publisher pushes
+        whatever has accumulated (up to one chunk) with push_many, so
+        publishing overlaps whatever the agent does between items and a slow
+        Redis applies backpressure. How much that is depends on the agent:
+        PriceCrawlerAgent extracts and fingerprints its whole table before
+        yielding the first row.
+        """
+        buffer = queue.Queue(maxsize=settings.STREAM_BUFFER_SIZE)
+        chunk_size = settings.STREAM_PUSH_CHUNK_SIZE
+        state = progress if progress is not None else {}
+        state.update(count=0, error=None)
+
+        def publish():
+            done = False
+            while not done:
+                batch = [buffer.get()]
+                while len(batch) < chunk_size:
+                    try:
+                        batch.append(buffer.get_nowait())
+                    except queue.Empty:
+                        break
+                if batch[-1] is _END_OF_STREAM:
+                    batch.pop()
+                    done = True
+                # Keep draining after a failure so the producer never blocks
+                if batch and state["error"] is None:
+                    try:
+                        state["count"] += agent.push_many(batch, chunk_size=chunk_size)
+                    except Exception as e:
+                        state["error"] = e
+
+        publisher = threading.Thread(target=publish, name=f"publisher-{agent.provider}", daemon=True)
+        publisher.start()
+        items = iter(agent.iter_fetch())
+        try:
+            for item in items:
+                if cancel is not None and cancel.is_set():
+                    print(f"Agent {agent.provider} cancelled")
+                    break
+                buffer.put(item)
+        finally:
+            if hasattr(items, "close"):
+                items.close()
+            buffer.put(_END_OF_STREAM)
+            publisher.join()
+
+        if state["error"] is not None:
+            raise state["error"]
+        # A cancelled run is incomplete, so its fingerprint must not be recorded
+        if cancel is None or not cancel.is_set():
+            agent.commit_state()
+        return state["count"]
+
     def dump_registry_json(self):
         """
         Dumps the current DB state to registry/latest.json
@@ -1,7 +1,28 @@
-from typing import Optional
+from typing import Optional, Dict, List, Tuple
 from app.storage.redis import get_redis
 from app.utils.hashing import compute_hash
 
+# Hash of per-model value hashes, field "<provider>:<model>".
+# Deleting it forces the worker to re-diff every model against the DB.
+ENTRY_HASHES_KEY = "state:registry:entry_hashes"
+# Stream id of the last message applied per model, same fields. Messages
+# older than it (reclaimed from a dead consumer, replayed from the DLQ) are
+# skipped instead of overwriting newer data.
+ENTRY_VERSIONS_KEY = "state:registry:entry_versions"
+
+def entry_hash_field(provider: str, model: str) -> str:
+    return f"{provider}:{model}"
+
+def parse_stream_id(stream_id: str) -> Tuple[int, int]:
+    ms, _, seq = stream_id.partition("-")
+    return int(ms), int(seq or 0)
+
+def is_newer_version(version: str, applied: Optional[str]) -> bool:
+    """
+    True if the message with stream id `version` comes after the last applied one.
+    """
+    return applied is None or parse_stream_id(version) > parse_stream_id(applied)
+
 class StateManager:
     """
     Tracks the state of ingested data to avoid redundant processing.
@@ -26,3 +47,48 @@ class StateManager:
     def update_state(self, provider: str, data_hash: str):
         key = f"state:{provider}:last_hash"
         self.redis.set(key, data_hash)
+
+    def get_validators(self, source: str) -> Dict[str, str]:
+        """
+        Returns the HTTP validators (etag / last_modified) stored for a source.
+        """
+        return self.redis.hgetall(f"state:{source}:validators")
+
+    def update_validators(self, source: str, validators: Dict[str, str]):
+        key = f"state:{source}:validators"
+        self.redis.delete(key)
+        if validators:
+            self.redis.hset(key, mapping=validators)
+
+    def get_entry_hashes(self, keys: List[Tuple[str, str]]) -> List[Optional[str]]:
+        """
+        Returns the last committed value hash for each (provider, model), or None.
+        """
+        if not keys:
+            return []
+        return self.redis.hmget(ENTRY_HASHES_KEY, [entry_hash_field(provider, model) for provider, model in keys])
+
+    def get_entry_state(self, keys: List[Tuple[str, str]]) -> Tuple[List[Optional[str]], List[Optional[str]]]:
+        """
+        Returns the last committed value hashes and the stream ids of the
+        last applied messages for each (provider, model), in one round trip.
+        """
+        if not keys:
+            return [], []
+        fields = [entry_hash_field(provider, model) for provider, model in keys]
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hmget(ENTRY_HASHES_KEY, fields)
+        pipe.hmget(ENTRY_VERSIONS_KEY, fields)
+        hashes, versions = pipe.execute()
+        return hashes, versions
+
+    def update_entry_hashes(self, hashes: Dict[Tuple[str, str], str], versions: Optional[Dict[Tuple[str, str], str]] = None):
+        """
+        Records committed value hashes and, if given, the stream ids they came from.
+        """
+        pipe = self.redis.pipeline(transaction=True)
+        if hashes:
+            pipe.hset(ENTRY_HASHES_KEY, mapping={entry_hash_field(provider, model): h for (provider, model), h in hashes.items()})
+        if versions:
+            pipe.hset(ENTRY_VERSIONS_KEY, mapping={entry_hash_field(provider, model): v for (provider, model), v in versions.items()})
+        pipe.execute()
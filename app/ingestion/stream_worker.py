@@ -1,23 +1,134 @@
 import json
+import os
+import socket
 import time
-from typing import Optional
+from contextlib import nullcontext
+from typing import Optional, List, Tuple, Dict, Any
+from sqlalchemy import tuple_
+from app.config import settings
 from app.storage.redis import get_redis
-from app.storage.postgres import SessionLocal
-from app.models.registry import RegistryEntry, RegistryEntryData
-from app.models.history import HistoryEntry
+from app.storage.postgres import SessionLocal, engine, upsert_models, flatten_registry_entry
+from app.models.registry import RegistryEntry, EntryRecord
+from app.models.history import HistoryEntry, ensure_history_partitions
 from app.ingestion.normalizer import Normalizer
 from app.diff.semantic_diff import SemanticDiff
-from app.utils.hashing import compute_hash
+from app.ingestion.state_manager import StateManager, is_newer_version
+from app.ingestion.dead_letter import DeadLetterQueue
+from app.ingestion.metrics import WorkerMetrics, FRESHNESS_BUCKETS
+from app.utils.hashing import compute_entry_digests, stored_digests, load_digests
 
 STREAM_KEY = "stream:ingestion"
 CONSUMER_GROUP = "ingestion_group"
-CONSUMER_NAME = "worker_1"
+
+def _stage(metrics: Optional[WorkerMetrics], name: str):
+    return metrics.stage(name) if metrics is not None else nullcontext()
+
+def decode_message(normalizer: Normalizer, message_data: Dict[str, Any], metrics: Optional[WorkerMetrics] = None) -> Optional[EntryRecord]:
+    """
+    Decodes and normalizes a stream message ({"payload": json_string}).
+    Returns None for messages without a payload.
+    """
+    raw_payload = message_data.get("payload")
+    if not raw_payload:
+        return None
+    with _stage(metrics, "decode"):
+        item = json.loads(raw_payload)
+    provider_name = item.get("provider", "unknown")
+    with _stage(metrics, "normalize"):
+        return normalizer.normalize_record(item, provider_name)
+
+def read_trace(message_data: Dict[str, Any], dequeued_at: float) -> Dict[str, Any]:
+    """
+    Trace fields stamped by BaseAgent.trace_fields plus the dequeue time.
+    Messages published without them (e.g. DLQ replays) get None values.
+    """
+    def seconds(field):
+        value = message_data.get(field)
+        return float(value) if value else None
+
+    return {
+        "trace_id": message_data.get("trace_id"),
+        "crawl_started_at": seconds("crawl_started_at"),
+        "published_at": seconds("published_at"),
+        "dequeued_at": dequeued_at
+    }
+
+def message_version(message_id: str, message_data: Dict[str, Any]) -> str:
+    """
+    Stream id a message is ordered by against updates already applied:
+    its own id, or the original one for DLQ replays.
+    """
+    return message_data.get("origin_id") or message_id
+
+def load_entry_data(data: Any, digests: Optional[Dict[str, Any]] = None) -> EntryRecord:
+    """
+    Wraps a stored registry_entries.data value (and its digests column).
+    Stored rows were validated on the way in, so they are not re-validated.
+    """
+    return EntryRecord.from_stored(data, load_digests(digests))
+
+def record_freshness(metrics: WorkerMetrics, trace: Optional[Dict[str, Any]], committed_at: float):
+    """
+    End-to-end latencies of a message whose change was just committed.
+    """
+    if not trace:
+        return
+    if trace["crawl_started_at"]:
+        metrics.observe("freshness_seconds", committed_at - trace["crawl_started_at"], FRESHNESS_BUCKETS)
+    if trace["published_at"]:
+        metrics.observe("publish_to_commit_seconds", committed_at - trace["published_at"], FRESHNESS_BUCKETS)
+        metrics.observe("queue_seconds", trace["dequeued_at"] - trace["published_at"], FRESHNESS_BUCKETS)
+
+def collect_stream_stats(redis_client, metrics: WorkerMetrics):
+    """
+    Consumer lag (entries not yet delivered to the group) and pending
+    count (delivered but not ACKed), read from XINFO GROUPS.
+    """
+    group = next((g for g in redis_client.xinfo_groups(STREAM_KEY) if g["name"] == CONSUMER_GROUP), None)
+    if group is None:
+        return
+    lag = group.get("lag")
+    if lag is None and group.get("entries-read") is not None:
+        # Redis reports no lag after deletions; fall back to length - entries read
+        lag = max(redis_client.xlen(STREAM_KEY) - group["entries-read"], 0)
+    if lag is not None:
+        metrics.set_gauge("consumer_lag", lag)
+    metrics.set_gauge("pending_messages", group["pending"])
+    metrics.set_gauge("stream_length", redis_client.xlen(STREAM_KEY))
+
+def ensure_partitions():
+    """
+    Creates upcoming history_entries partitions (PostgreSQL) so writes never
+    land in the DEFAULT partition after a month rolls over.
+    """
+    with engine.begin() as conn:
+        ensure_history_partitions(conn)
+
+def default_consumer_name() -> str:
+    """
+    Consumer identity for this process, unique across hosts and processes
+    so several workers can share the same consumer group.
+    """
+    return settings.WORKER_CONSUMER_NAME or f"{socket.gethostname()}-{os.getpid()}"
 
 class StreamWorker:
-    def __init__(self):
+    def __init__(self, batch_size: Optional[int] = None, consumer_name: Optional[str] = None):
         self.redis = get_redis()
+        self.consumer_name = consumer_name or default_consumer_name()
         self.normalizer = Normalizer()
         self.diff_engine = SemanticDiff()
+        self.state_manager = StateManager()
+        self.dead_letters = DeadLetterQueue(STREAM_KEY, CONSUMER_GROUP)
+        self.batch_mode = settings.WORKER_BATCH_MODE
+        self.batch_size = batch_size or settings.WORKER_BATCH_SIZE
+        self.coalesce = settings.WORKER_COALESCE
+        self.coalesce_window_ms = settings.WORKER_COALESCE_WINDOW_MS
+        self.claim_interval = settings.WORKER_CLAIM_INTERVAL
+        self.claim_min_idle_ms = settings.WORKER_CLAIM_MIN_IDLE_MS
+        self._last_claim = 0.0
+        self.metrics = WorkerMetrics(labels={"consumer": self.consumer_name})
+        self.metrics.add_collector(self._collect_stream_stats)
+        self._last_metrics_publish = 0.0
         self.setup_stream()
 
     def setup_stream(self):
@@ -30,96 +141,405 @@ class StreamWorker:
             else:
                 print(f"Error creating consumer group: {e}")
 
-    def process_message(self, message_id, message_data):
+    def process_message(self, message_id, message_data, dequeued_at: Optional[float] = None):
         """
         Process a single message from the stream.
-        Expected format: {"payload": json_string}
+        Expected format: {"payload": json_string, plus optional trace fields}
         """
-        raw_payload = message_data.get("payload")
-        if not raw_payload:
-            return
-
+        trace = read_trace(message_data, dequeued_at or time.time())
         try:
-            item = json.loads(raw_payload)
-            provider_name = item.get("provider", "unknown")
-            
-            # Normalize
-            new_entry_data = self.normalizer.normalize(item, provider_name)
-            
-            self._save_to_db(new_entry_data)
-            
-            # ACK message
-            self.redis.xack(STREAM_KEY, CONSUMER_GROUP, message_id)
-            # Optional: Delete to keep stream size manageable
-            # self.redis.xdel(STREAM_KEY, message_id)
-            
+            # Decode + normalize
+            new_entry_data = decode_message(self.normalizer, message_data, self.metrics)
+            if new_entry_data is None:
+                raise ValueError("Message has no payload")
+            key = (new_entry_data.provider, new_entry_data.model)
+            version = message_version(message_id, message_data)
+
+            # Unchanged since the last commit: skip the DB read and the diff
+            with self.metrics.stage("hash"):
+                entry_hash, new_entry_data.digests = compute_entry_digests(new_entry_data.to_dict())
+                (stored_hash,), (applied,) = self.state_manager.get_entry_state([key])
+            if not is_newer_version(version, applied):
+                # Older than the update already applied (reclaimed or replayed late)
+                print(f"Skipping {message_id} (version {version}): {key[0]}/{key[1]} already has {applied}")
+                self.metrics.inc("messages_stale")
+            elif stored_hash == entry_hash:
+                self.metrics.inc("messages_unchanged")
+                self.state_manager.update_entry_hashes({}, {key: version})
+            else:
+                self._save_to_db(new_entry_data, trace)
+                self.state_manager.update_entry_hashes({key: entry_hash}, {key: version})
+
+            # ACK message (acked messages are trimmed by DeadLetterQueue.trim_stream)
+            self._ack([message_id])
+            self.metrics.inc("messages_processed")
+
         except Exception as e:
+            # Left pending: retried by XAUTOCLAIM, dead-lettered after WORKER_MAX_DELIVERIES
             print(f"Error processing message {message_id}: {e}")
+            self.metrics.inc("messages_failed")
+            self.dead_letters.record_failure([message_id], e)
+
+    def process_batch(self, rows: List[Tuple[str, Dict[str, Any]]], dequeued_at: Optional[float] = None):
+        """
+        Process a whole xreadgroup batch in one DB transaction.
+        Messages are ACKed together once the batch has been committed.
+        """
+        dequeued_at = dequeued_at or time.time()
+        message_ids = []
+        entries = []
+        hashes = []
+        traces = []
+        versions = []
+        decoded_rows = []
+        self.metrics.inc("batches")
+        for message_id, message_data in rows:
+            try:
+                new_entry_data = decode_message(self.normalizer, message_data, self.metrics)
+                if new_entry_data is None:
+                    raise ValueError("Message has no payload")
+                with self.metrics.stage("hash"):
+                    entry_hash, new_entry_data.digests = compute_entry_digests(new_entry_data.to_dict())
+                    hashes.append(entry_hash)
+                entries.append(new_entry_data)
+                traces.append(read_trace(message_data, dequeued_at))
+                versions.append(message_version(message_id, message_data))
+                message_ids.append(message_id)
+                decoded_rows.append((message_id, message_data))
+            except Exception as e:
+                print(f"Error processing message {message_id}: {e}")
+                self.metrics.inc("messages_failed")
+                self.dead_letters.record_failure([message_id], e)
+
+        if not entries:
+            return
 
-    def _save_to_db(self, new_entry_data: RegistryEntryData):
+        keys = [(e.provider, e.model) for e in entries]
+        stored_hashes, stored_versions = self.state_manager.get_entry_state(keys)
+        current = dict(zip(keys, stored_hashes))
+
+        # Drop updates older than the one already applied to their model
+        # (reclaimed from a dead consumer, replayed from the DLQ). Checked in
+        # stream order, so an older copy later in the batch is dropped too.
+        applied = dict(zip(keys, stored_versions))
+        fresh = []
+        for index, (key, version) in enumerate(zip(keys, versions)):
+            if is_newer_version(version, applied[key]):
+                applied[key] = version
+                fresh.append(index)
+        if len(fresh) < len(entries):
+            print(f"Skipping {len(entries) - len(fresh)} messages older than the applied updates")
+            self.metrics.inc("messages_stale", len(entries) - len(fresh))
+            entries, hashes, traces, versions = ([values[i] for i in fresh] for values in (entries, hashes, traces, versions))
+
+        if self.coalesce:
+            entries, hashes, traces, versions = self._coalesce(entries, hashes, traces, versions)
+
+        # Only entries whose value hash moved need the DB read and the diff.
+        # Hashes are tracked in stream order so repeated keys compare
+        # against the previous copy in the batch.
+        keys = [(e.provider, e.model) for e in entries]
+        changed = []
+        changed_traces = []
+        new_hashes = {}
+        new_versions = {}
+        for key, entry, entry_hash, trace, version in zip(keys, entries, hashes, traces, versions):
+            new_versions[key] = version
+            if entry_hash != current[key]:
+                changed.append(entry)
+                changed_traces.append(trace)
+                current[key] = new_hashes[key] = entry_hash
+        self.metrics.inc("messages_unchanged", len(entries) - len(changed))
+
+        if changed:
+            try:
+                self._save_batch_to_db(changed, changed_traces)
+            except Exception:
+                # Isolate the failing message(s): each one then fails, retries
+                # and dead-letters on its own instead of blocking the batch
+                print(f"Batch of {len(decoded_rows)} failed, retrying messages one by one")
+                for message_id, message_data in decoded_rows:
+                    self.process_message(message_id, message_data, dequeued_at)
+                return
+        self.state_manager.update_entry_hashes(new_hashes, new_versions)
+        self._ack(message_ids)
+        self.metrics.inc("messages_processed", len(message_ids))
+
+    def _coalesce(self, entries: List[EntryRecord], *columns: List[Any]) -> Tuple[List[Any], ...]:
+        """
+        Keeps only the latest entry per (provider, model) in the batch, along
+        with the matching items of each parallel list in columns.
+        Superseded messages are still ACKed with the rest of the batch.
+        """
+        latest = {}
+        for index, entry in enumerate(entries):
+            latest[(entry.provider, entry.model)] = index
+        if len(latest) == len(entries):
+            return (entries, *columns)
+
+        keep = sorted(latest.values())
+        print(f"Coalesced {len(entries)} messages into {len(keep)} updates")
+        return tuple([values[i] for i in keep] for values in (entries, *columns))
+
+    def _ack(self, message_ids: List[str]):
+        with self.metrics.stage("xack"):
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.xack(STREAM_KEY, CONSUMER_GROUP, *message_ids)
+            pipe.hdel(self.dead_letters.errors_key, *message_ids)
+            pipe.execute()
+
+    def _load_entry_data(self, entry_db: Optional[RegistryEntry]) -> Optional[EntryRecord]:
+        if entry_db is None:
+            return None
+        return load_entry_data(entry_db.data, entry_db.digests)
+
+    def _record_freshness(self, trace: Optional[Dict[str, Any]], committed_at: float):
+        record_freshness(self.metrics, trace, committed_at)
+
+    def _save_to_db(self, new_entry_data: EntryRecord, trace: Optional[Dict[str, Any]] = None):
         db = SessionLocal()
         try:
             # Check for existing
-            existing_entry_db = db.query(RegistryEntry).filter_by(
-                provider=new_entry_data.provider, 
-                model=new_entry_data.model
-            ).first()
-            
-            old_entry_data = None
-            if existing_entry_db:
-                data_dict = existing_entry_db.data if isinstance(existing_entry_db.data, dict) else json.loads(existing_entry_db.data)
-                old_entry_data = RegistryEntryData(**data_dict)
+            with self.metrics.stage("db_load"):
+                existing_entry_db = db.query(RegistryEntry).filter_by(
+                    provider=new_entry_data.provider,
+                    model=new_entry_data.model
+                ).first()
+
+                old_entry_data = self._load_entry_data(existing_entry_db)
 
             # Diff
-            diff = self.diff_engine.compute_diff(old_entry_data, new_entry_data)
-            
+            with self.metrics.stage("diff"):
+                diff = self.diff_engine.compute_diff(old_entry_data, new_entry_data)
+
             if diff["type"] == "new_model" or diff["changes"]:
                 print(f"Update: {new_entry_data.provider}/{new_entry_data.model}")
-                entry_dict = new_entry_data.model_dump(mode='json')
-                
-                if existing_entry_db:
-                    existing_entry_db.data = entry_dict
-                else:
-                    new_db_entry = RegistryEntry(
+                with self.metrics.stage("db_write"):
+                    entry_dict = new_entry_data.to_dict()
+                    digests = stored_digests(new_entry_data.digests) if new_entry_data.digests else None
+
+                    if not existing_entry_db:
+                        existing_entry_db = RegistryEntry(
+                            provider=new_entry_data.provider,
+                            model=new_entry_data.model
+                        )
+                        db.add(existing_entry_db)
+                    existing_entry_db.set_data(entry_dict, digests)
+
+                    # History
+                    history_entry = HistoryEntry(
                         provider=new_entry_data.provider,
                         model=new_entry_data.model,
-                        data=entry_dict
+                        diff=diff,
+                        snapshot=entry_dict,
+                        trace_id=trace["trace_id"] if trace else None
                     )
-                    db.add(new_db_entry)
-                
-                # History
-                history_entry = HistoryEntry(
-                    provider=new_entry_data.provider,
-                    model=new_entry_data.model,
-                    diff=diff,
-                    snapshot=entry_dict
-                )
-                db.add(history_entry)
-                db.commit()
+                    db.add(history_entry)
+
+                    # Keep the flattened models projection in the same transaction
+                    model_row = flatten_registry_entry(entry_dict)
+                    if model_row:
+                        upsert_models(db, [model_row])
+                    db.commit()
+                self.metrics.inc("entries_written")
+                self._record_freshness(trace, time.time())
             else:
                 # No change, just log debug or skip
                 pass
-                
+
         except Exception as e:
             print(f"DB Error: {e}")
             db.rollback()
+            raise
         finally:
             db.close()
 
-    def run(self):
-        print(f"Worker listening on {STREAM_KEY}...")
+    def _save_batch_to_db(self, entries: List[EntryRecord], traces: Optional[List[Dict[str, Any]]] = None):
+        """
+        Loads every existing entry of the batch with a single
+        SELECT ... WHERE (provider, model) IN (...), bulk inserts the
+        history rows and commits once. Rolls back and re-raises on error.
+        traces, if given, runs parallel to entries.
+        """
+        traces = traces or [None] * len(entries)
+        db = SessionLocal()
+        try:
+            keys = list({(e.provider, e.model) for e in entries})
+            with self.metrics.stage("db_load"):
+                existing = {
+                    (row.provider, row.model): row
+                    for row in db.query(RegistryEntry).filter(
+                        tuple_(RegistryEntry.provider, RegistryEntry.model).in_(keys)
+                    )
+                }
+
+            history_rows = []
+            model_rows = []
+            written_traces = []
+            for new_entry_data, trace in zip(entries, traces):
+                key = (new_entry_data.provider, new_entry_data.model)
+                existing_entry_db = existing.get(key)
+                old_entry_data = self._load_entry_data(existing_entry_db)
+
+                with self.metrics.stage("diff"):
+                    diff = self.diff_engine.compute_diff(old_entry_data, new_entry_data)
+                if diff["type"] != "new_model" and not diff["changes"]:
+                    continue
+
+                print(f"Update: {new_entry_data.provider}/{new_entry_data.model}")
+                entry_dict = new_entry_data.to_dict()
+
+                digests = stored_digests(new_entry_data.digests) if new_entry_data.digests else None
+
+                if not existing_entry_db:
+                    # Track it so later duplicates in the same batch diff against it
+                    existing_entry_db = existing[key] = RegistryEntry(
+                        provider=new_entry_data.provider,
+                        model=new_entry_data.model
+                    )
+                    db.add(existing_entry_db)
+                existing_entry_db.set_data(entry_dict, digests)
+
+                history_rows.append({
+                    "provider": new_entry_data.provider,
+                    "model": new_entry_data.model,
+                    "diff": diff,
+                    "snapshot": entry_dict,
+                    "trace_id": trace["trace_id"] if trace else None
+                })
+                model_row = flatten_registry_entry(entry_dict)
+                if model_row:
+                    model_rows.append(model_row)
+                written_traces.append(trace)
+
+            # Registry rows are flushed by the commit, so both count as the write
+            with self.metrics.stage("db_write"):
+                if history_rows:
+                    db.bulk_insert_mappings(HistoryEntry, history_rows)
+                if model_rows:
+                    upsert_models(db, model_rows)
+                db.commit()
+            self.metrics.inc("entries_written", len(history_rows))
+            committed_at = time.time()
+            for trace in written_traces:
+                self._record_freshness(trace, committed_at)
+
+        except Exception as e:
+            print(f"DB Error: {e}")
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def handle_rows(self, rows: List[Tuple[str, Dict[str, Any]]]):
+        dequeued_at = time.time()
+        if self.batch_mode:
+            self.process_batch(rows, dequeued_at)
+            return
+        for message_id, message_data in rows:
+            self.process_message(message_id, message_data, dequeued_at)
+
+    def claim_stale_messages(self) -> int:
+        """
+        Takes over messages that have been pending on any consumer of the group
+        for longer than claim_min_idle_ms (crashed peers, earlier failures)
+        and processes them again. Returns the number of reclaimed messages.
+        """
+        claimed = 0
+        start_id = "0-0"
+        while True:
+            result = self.redis.xautoclaim(
+                STREAM_KEY, CONSUMER_GROUP, self.consumer_name,
+                min_idle_time=self.claim_min_idle_ms,
+                start_id=start_id,
+                count=self.batch_size
+            )
+            start_id, rows = result[0], result[1]
+            # Entries trimmed from the stream come back without data
+            rows = [(message_id, data) for message_id, data in rows if data]
+            # Messages that keep failing go to the DLQ instead of another retry
+            rows = self.dead_letters.filter_exhausted(rows)
+            if rows:
+                claimed += len(rows)
+                self.handle_rows(rows)
+            if start_id == "0-0":
+                break
+
+        if claimed:
+            print(f"{self.consumer_name} reclaimed {claimed} pending messages")
+        self._prune_consumers()
+        return claimed
+
+    def _prune_consumers(self):
+        """
+        Removes consumers of dead processes once they have nothing pending,
+        so per-process identities don't pile up in the group.
+        """
+        for consumer in self.redis.xinfo_consumers(STREAM_KEY, CONSUMER_GROUP):
+            if consumer["name"] == self.consumer_name or consumer["pending"]:
+                continue
+            if consumer["idle"] > self.claim_min_idle_ms:
+                self.redis.xgroup_delconsumer(STREAM_KEY, CONSUMER_GROUP, consumer["name"])
+
+    def _collect_stream_stats(self, metrics: WorkerMetrics):
+        collect_stream_stats(self.redis, metrics)
+
+    def publish_metrics(self, force: bool = False):
+        if not settings.WORKER_METRICS_REDIS:
+            return
+        if not force and time.monotonic() - self._last_metrics_publish < settings.WORKER_METRICS_INTERVAL:
+            return
+        self._last_metrics_publish = time.monotonic()
+        key = f"metrics:worker:{self.consumer_name}"
+        self.metrics.publish(self.redis, key, ttl=settings.WORKER_METRICS_INTERVAL * 3)
+
+    def read_rows(self, count: int) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Blocks up to 5 seconds for new messages. In batch mode with a
+        coalescing window, keeps collecting until the batch is full or the
+        window since the first message has passed, so bursts of updates to
+        the same model land in one batch.
+        """
+        messages = self.redis.xreadgroup(CONSUMER_GROUP, self.consumer_name, {STREAM_KEY: ">"}, count=count, block=5000)
+        rows = [row for _, stream_rows in messages or [] for row in stream_rows]
+        if not rows or not self.batch_mode or not self.coalesce_window_ms:
+            return rows
+
+        deadline = time.monotonic() + self.coalesce_window_ms / 1000
+        while len(rows) < count:
+            remaining_ms = int((deadline - time.monotonic()) * 1000)
+            # block=0 would wait forever
+            if remaining_ms <= 0:
+                break
+            messages = self.redis.xreadgroup(CONSUMER_GROUP, self.consumer_name, {STREAM_KEY: ">"}, count=count - len(rows), block=remaining_ms)
+            if not messages:
+                break
+            rows.extend(row for _, stream_rows in messages for row in stream_rows)
+        return rows
+
+    def run(self, metrics_port: Optional[int] = None):
+        print(f"Worker {self.consumer_name} listening on {STREAM_KEY}...")
+        metrics_port = metrics_port if metrics_port is not None else settings.WORKER_METRICS_PORT
+        if metrics_port:
+            self.metrics.serve(metrics_port)
+        ensure_partitions()
+        count = self.batch_size if self.batch_mode else 10
         while True:
             try:
-                # Block for 5 seconds waiting for new messages
-                messages = self.redis.xreadgroup(CONSUMER_GROUP, CONSUMER_NAME, {STREAM_KEY: ">"}, count=10, block=5000)
-                
-                if not messages:
+                self.publish_metrics()
+                if time.monotonic() - self._last_claim >= self.claim_interval:
+                    self._last_claim = time.monotonic()
+                    self.claim_stale_messages()
+                    self.dead_letters.trim_stream()
+
+                rows = self.read_rows(count)
+
+                if not rows:
                     continue
-                    
-                for stream, rows in messages:
-                    for message_id, message_data in rows:
-                        self.process_message(message_id, message_data)
-                        
+
+                self.metrics.inc("messages_received", len(rows))
+                self.handle_rows(rows)
+
             except Exception as e:
                 print(f"Worker loop error: {e}")
                 time.sleep(1)
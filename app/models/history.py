@@ -1,22 +1,81 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from datetime import date, datetime, timezone
+from typing import List, Optional
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, event, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
+from app.config import settings
 from app.storage.postgres import Base
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
 class HistoryEntry(Base):
     __tablename__ = "history_entries"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # On PostgreSQL the table is range-partitioned by month on timestamp
+    # (see ensure_history_partitions), so the partition key is part of the
+    # primary key.
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     provider = Column(String, nullable=False)
     model = Column(String, nullable=False)
-    
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
-    
+
+    timestamp = Column(DateTime(timezone=True), primary_key=True, default=_utcnow, server_default=func.now())
+
     # Snapshot of the semantic diff or the change applied
-    diff = Column(JSONB, nullable=False) 
-    
-    # Snapshot of the full entry at this point (optional, but good for rollback)
-    snapshot = Column(JSONB, nullable=True)
+    diff = Column(JSONB, nullable=False)
 
-    # Could link to RegistryEntry if foreign keys are desired, 
+    # Snapshot of the full entry at this point (optional, but good for rollback).
+    # scripts/compact_history.py thins old snapshots to one per model and day.
+    snapshot = Column(JSONB(none_as_null=True), nullable=True)
+
+    # trace_id of the stream message that produced this change (see BaseAgent.trace_fields)
+    trace_id = Column(String, nullable=True, index=True)
+
+    # Could link to RegistryEntry if foreign keys are desired,
     # but soft linking via provider/model is often flexible for history.
+
+    __table_args__ = (
+        # Per-model time range scans
+        Index("ix_history_provider_model_timestamp", "provider", "model", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+def add_months(month: date, count: int) -> date:
+    year, index = divmod(month.month - 1 + count, 12)
+    return date(month.year + year, index + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"history_entries_{month:%Y_%m}"
+
+def ensure_history_partitions(conn, start: Optional[date] = None, months_ahead: Optional[int] = None) -> List[str]:
+    """
+    Creates the monthly partitions of history_entries from start's month
+    (default: the current one) through months_ahead months from now, plus a
+    DEFAULT partition for anything outside them. Idempotent; returns the
+    monthly partition names. Does nothing on databases other than PostgreSQL.
+    """
+    if conn.dialect.name != "postgresql":
+        return []
+    months_ahead = settings.HISTORY_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+
+    this_month = _utcnow().date().replace(day=1)
+    month = (start or this_month).replace(day=1)
+    last = add_months(this_month, months_ahead)
+
+    # Serializes concurrent callers (workers starting together): IF NOT EXISTS is not race-safe
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('history_entries_partitions'))"))
+    names = []
+    while month <= last:
+        name = partition_name(month)
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF history_entries "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+        ))
+        names.append(name)
+        month = add_months(month, 1)
+    conn.execute(text("CREATE TABLE IF NOT EXISTS history_entries_default PARTITION OF history_entries DEFAULT"))
+    return names
+
+@event.listens_for(HistoryEntry.__table__, "after_create")
+def _create_partitions(target, connection, **kw):
+    ensure_history_partitions(connection)
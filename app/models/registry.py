@@ -1,9 +1,11 @@
-from sqlalchemy import Column, String, DateTime, Index
+from sqlalchemy import Column, String, DateTime, Float, BigInteger, Index
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from app.storage.postgres import Base
+from app.utils.pricing import typed_columns
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+import json
 
 # --- Pydantic Models for JSONB Structure ---
 
@@ -33,6 +35,47 @@ class RegistryEntryData(BaseModel):
     model: str
     fields: ModelFields
 
+# Declared ModelFields, always present in the serialized form (None if unset)
+STANDARD_FIELDS = ("pricing", "context_window", "rate_limits", "capabilities")
+
+class EntryRecord:
+    """
+    Slotted, JSON-ready counterpart of RegistryEntryData for the worker hot
+    path. `fields` maps field name -> FieldMetadata dict (or None) exactly as
+    RegistryEntryData.model_dump(mode='json') would, so to_dict() is the
+    stored registry_entries.data value and hashes match the pydantic form.
+
+    Records are built from already validated data (Normalizer.normalize_record
+    or a stored row) and are not validated again. `digests` optionally holds
+    per-field digests (app.utils.hashing.compute_field_digests).
+    """
+    __slots__ = ("provider", "model", "fields", "digests")
+
+    def __init__(self, provider: str, model: str, fields: Dict[str, Optional[Dict[str, Any]]], digests: Optional[Dict[str, str]] = None):
+        self.provider = provider
+        self.model = model
+        self.fields = fields
+        self.digests = digests
+
+    @classmethod
+    def from_stored(cls, data: Any, digests: Optional[Dict[str, str]] = None) -> "EntryRecord":
+        """
+        Wraps a registry_entries.data value (dict or JSON string).
+        """
+        data_dict = data if isinstance(data, dict) else json.loads(data)
+        return cls(data_dict["provider"], data_dict["model"], data_dict.get("fields") or {}, digests)
+
+    @classmethod
+    def from_model(cls, entry: RegistryEntryData) -> "EntryRecord":
+        data = entry.model_dump(mode='json')
+        return cls(data["provider"], data["model"], data["fields"])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"provider": self.provider, "model": self.model, "fields": self.fields}
+
+    def to_model(self) -> RegistryEntryData:
+        return RegistryEntryData(**self.to_dict())
+
 # --- SQLAlchemy Model ---
 
 class RegistryEntry(Base):
@@ -43,10 +86,40 @@ class RegistryEntry(Base):
     
     # Stores the full JSON structure including fields with metadata
     data = Column(JSONB, nullable=False)
+
+    # {"scheme", "fields": {field: digest}} of `data`, so diffs can skip
+    # unchanged fields without re-serializing the stored side
+    digests = Column(JSONB(none_as_null=True), nullable=True)
+
+    # Typed copies of `data` for filtering and sorting (see app.utils.pricing.typed_columns).
+    # Prices are per single token whatever unit the source quoted; None if unknown.
+    input_price_per_token = Column(Float, nullable=True)
+    output_price_per_token = Column(Float, nullable=True)
+    context_window = Column(BigInteger, nullable=True)
     
     last_updated = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     __table_args__ = (
         Index("ix_registry_provider", "provider"),
         Index("ix_registry_model", "model"),
+        Index("ix_registry_input_price", "input_price_per_token"),
+        Index("ix_registry_output_price", "output_price_per_token"),
+        Index("ix_registry_context_window", "context_window"),
+        # "cheapest with at least N context" and "cheapest of a provider"
+        Index("ix_registry_input_price_context", "input_price_per_token", "context_window"),
+        Index("ix_registry_provider_input_price", "provider", "input_price_per_token"),
+        # Ad-hoc containment queries on the document (data @> '{...}')
+        Index("ix_registry_data_gin", "data", postgresql_using="gin"),
     )
+
+    def set_data(self, data: Dict[str, Any], digests: Optional[Dict[str, Any]] = None):
+        """
+        Stores a serialized RegistryEntryData with its digests and refreshes the typed columns.
+        """
+        self.data = data
+        self.digests = digests
+        self.refresh_typed_columns()
+
+    def refresh_typed_columns(self):
+        for column, value in typed_columns(self.data).items():
+            setattr(self, column, value)
@@ -1,6 +1,8 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, JSON, DateTime, func, Text
+from sqlalchemy import create_engine, Column, Integer, String, Float, JSON, DateTime, func, Text, Table, MetaData, select, delete, insert, text
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.dialects import postgresql, sqlite
 from app.config import settings
+from app.utils.pricing import field_value, pricing_value, parse_price, parse_token_count
 import json
 
 DATABASE_URL = settings.DATABASE_URL
@@ -72,17 +74,165 @@ def upsert_model(db, model_data):
     
     db.commit()
 
+# Columns set by upsert_model / bulk_upsert_models, with insert defaults
+MODEL_COLUMN_DEFAULTS = {
+    'provider': 'Unknown',
+    'input_price': 0.0,
+    'output_price': 0.0,
+    'context_window': 0,
+    'config': {}
+}
+
+def _dialect_insert(db):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"bulk upsert is not supported on {dialect}")
+
+def model_upsert_statements(db, models):
+    """
+    INSERT ... ON CONFLICT (name) DO UPDATE statements writing models, one
+    per set of provided columns so each row only overwrites what it has.
+    Same semantics as upsert_model: keys missing from a row keep the stored
+    value on update and take the defaults on insert. Rows repeating a name
+    are merged in order, later keys winning. Works with sync and async
+    sessions; nothing is committed.
+    """
+    insert = _dialect_insert(db)
+    latest = {}
+    for m in models:
+        latest.setdefault(m['name'], {}).update(m)
+
+    groups = {}
+    for name, m in latest.items():
+        provided = tuple(c for c in MODEL_COLUMN_DEFAULTS if c in m)
+        groups.setdefault(provided, []).append(
+            {'name': name, **{c: m.get(c, default) for c, default in MODEL_COLUMN_DEFAULTS.items()}}
+        )
+
+    statements = []
+    for update_columns, rows in groups.items():
+        stmt = insert(Model).values(rows)
+        statements.append(stmt.on_conflict_do_update(
+            index_elements=[Model.name],
+            set_={**{c: stmt.excluded[c] for c in update_columns}, 'last_updated': func.now()}
+        ))
+    return statements
+
+def upsert_models(db, models):
+    """
+    Writes models in the caller's transaction (see model_upsert_statements).
+    """
+    for stmt in model_upsert_statements(db, models):
+        db.execute(stmt)
+
+def bulk_upsert_models(db, models, chunk_size=None):
+    """
+    Insert or update many models with INSERT ... ON CONFLICT (name) DO UPDATE
+    and one commit per chunk (one statement per chunk when all rows carry the
+    same keys, as in the migration). Returns the number of rows written.
+    """
+    chunk_size = chunk_size or settings.DB_UPSERT_CHUNK_SIZE
+
+    count = 0
+    for start in range(0, len(models), chunk_size):
+        chunk = models[start:start + chunk_size]
+        upsert_models(db, chunk)
+        db.commit()
+        count += len({m['name'] for m in chunk})
+    return count
+
+def flatten_registry_entry(entry):
+    """
+    Maps a serialized RegistryEntryData (registry_entries.data) to the
+    columns of the models table, or returns None if it has no model name.
+    Prices stay in the unit the source quoted; values are parsed like the
+    typed registry_entries columns (app.utils.pricing), with 0 for unknown.
+    The entry is kept in config without unset (None) fields, which the API
+    read path does not expect.
+    """
+    name = entry.get('model')
+    if not name:
+        return None
+
+    fields = entry.get('fields') or {}
+    pricing = pricing_value(fields)
+
+    return {
+        'name': name,
+        'provider': entry.get('provider') or 'Unknown',
+        'input_price': parse_price(pricing.get('input')) or 0.0,
+        'output_price': parse_price(pricing.get('output')) or 0.0,
+        'context_window': parse_token_count(field_value(fields, 'context_window')) or 0,
+        'config': {**entry, 'fields': {k: v for k, v in fields.items() if v is not None}}
+    }
+
 def clear_leaderboard(db):
     db.query(Leaderboard).delete()
     db.commit()
 
+def _leaderboard_row(entry):
+    return {
+        'rank': int(entry.get('rank', 0)),
+        'model': entry.get('model'),
+        'arena_score': entry.get('arena_score'),
+        'ci_95': entry.get('ci_95'),
+        'category': entry.get('category', 'Overall')
+    }
+
 def insert_leaderboard_entry(db, entry):
-    lb = Leaderboard(
-        rank=int(entry.get('rank', 0)),
-        model=entry.get('model'),
-        arena_score=entry.get('arena_score'),
-        ci_95=entry.get('ci_95'),
-        category=entry.get('category', 'Overall')
-    )
+    lb = Leaderboard(**_leaderboard_row(entry))
     db.add(lb)
 
+LEADERBOARD_COLUMNS = ('rank', 'model', 'arena_score', 'ci_95', 'category')
+
+def replace_leaderboard(db, entries, chunk_size=None):
+    """
+    Replaces the whole leaderboard atomically. Rows are loaded into a
+    temporary staging table with multi-row INSERTs, then the live table is
+    swapped with DELETE + INSERT ... SELECT in the same transaction, so
+    readers see either the old or the new leaderboard, never an empty or
+    partial one. On PostgreSQL concurrent calls are serialized with a table
+    lock. Rolls back (keeping the old rows) on error.
+    Returns the number of rows loaded.
+    """
+    chunk_size = chunk_size or settings.DB_UPSERT_CHUNK_SIZE
+    rows = [_leaderboard_row(entry) for entry in entries]
+
+    # Per-call metadata: the temp table only exists in this transaction
+    staging = Table(
+        "leaderboard_staging", MetaData(),
+        Column("rank", Integer),
+        Column("model", String),
+        Column("arena_score", Integer),
+        Column("ci_95", String),
+        Column("category", String),
+        prefixes=["TEMPORARY"]
+    )
+    try:
+        conn = db.connection()
+        staging.drop(conn, checkfirst=True)
+        staging.create(conn)
+        for start in range(0, len(rows), chunk_size):
+            db.execute(insert(staging).values(rows[start:start + chunk_size]))
+
+        if conn.dialect.name == "postgresql":
+            # Serializes concurrent loaders (both would otherwise keep their rows
+            # under READ COMMITTED); readers are not blocked
+            db.execute(text("LOCK TABLE leaderboard IN SHARE ROW EXCLUSIVE MODE"))
+        db.execute(delete(Leaderboard))
+        db.execute(
+            insert(Leaderboard).from_select(
+                LEADERBOARD_COLUMNS,
+                select(*[staging.c[c] for c in LEADERBOARD_COLUMNS])
+            )
+        )
+        staging.drop(conn)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(rows)
+
@@ -1,5 +1,9 @@
 import redis
+import redis.asyncio
 from app.config import settings
 
 def get_redis():
     return redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+def get_async_redis():
+    return redis.asyncio.from_url(settings.REDIS_URL, decode_responses=True)
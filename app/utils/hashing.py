@@ -1,14 +1,91 @@
 import hashlib
 import json
-from typing import Any
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional, stdlib json is the fallback
+    orjson = None
+
+try:
+    import xxhash
+except ImportError:  # optional, blake2b is the fallback
+    xxhash = None
+
+# Identifies serializer + digest. Digests are only comparable within a scheme
+# (orjson and json format some floats differently), so it is stored with them.
+DIGEST_SCHEME = f"{'orjson' if orjson else 'json'}+{'xxh3' if xxhash else 'blake2b'}"
+
+def canonical_bytes(data: Any) -> bytes:
+    """
+    Compact, key-sorted JSON encoding of data.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+def digest_bytes(payload: bytes) -> str:
+    """
+    128-bit non-cryptographic digest for change detection.
+    """
+    if xxhash is not None:
+        return xxhash.xxh3_128_hexdigest(payload)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
 
 def compute_hash(data: Any) -> str:
     """
-    Computes a stable SHA-256 hash of a dictionary or list.
+    Computes a stable digest of a dictionary or list (or the str() of
+    anything else) for change detection.
     """
     if isinstance(data, (dict, list)):
-        serialized = json.dumps(data, sort_keys=True, default=str)
-    else:
-        serialized = str(data)
-    
-    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+        return digest_bytes(canonical_bytes(data))
+    return digest_bytes(str(data).encode("utf-8"))
+
+# Field metadata that changes on every crawl without the data changing
+VOLATILE_FIELD_KEYS = ("last_verified",)
+
+def compute_field_digests(fields: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Digest per set field of a serialized ModelFields, ignoring volatile
+    metadata. Fields that are None are left out.
+    """
+    digests = {}
+    for name, meta in fields.items():
+        if meta is None:
+            continue
+        if isinstance(meta, dict):
+            meta = {k: v for k, v in meta.items() if k not in VOLATILE_FIELD_KEYS}
+        digests[name] = compute_hash(meta)
+    return digests
+
+def compute_entry_digests(entry: Dict[str, Any]) -> Tuple[str, Dict[str, str]]:
+    """
+    Returns (entry hash, per-field digests) of a serialized RegistryEntryData.
+    Each field is serialized once; the entry hash is built from the field
+    digests, so re-crawls of unchanged data (only last_verified moved) match.
+    """
+    field_digests = compute_field_digests(entry.get("fields") or {})
+    entry_hash = compute_hash([entry.get("provider"), entry.get("model"), sorted(field_digests.items())])
+    return entry_hash, field_digests
+
+def compute_entry_hash(entry: Dict[str, Any]) -> str:
+    """
+    Computes the hash of a serialized RegistryEntryData, ignoring volatile
+    field metadata (last_verified) so re-crawls of unchanged data match.
+    """
+    return compute_entry_digests(entry)[0]
+
+def stored_digests(field_digests: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Value for the registry_entries.digests column.
+    """
+    return {"scheme": DIGEST_SCHEME, "fields": field_digests}
+
+def load_digests(stored: Optional[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+    """
+    Per-field digests from a registry_entries.digests value, or None if
+    missing or computed with another scheme.
+    """
+    if not stored or stored.get("scheme") != DIGEST_SCHEME:
+        return None
+    return stored.get("fields")
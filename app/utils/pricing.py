@@ -0,0 +1,108 @@
+import re
+from typing import Any, Dict, Optional
+
+# Crawlers report prices per million tokens unless they say otherwise
+DEFAULT_UNIT = "1M tokens"
+
+_MULTIPLIERS = {
+    "": 1, "k": 1_000, "thousand": 1_000,
+    "m": 1_000_000, "million": 1_000_000,
+    "b": 1_000_000_000, "billion": 1_000_000_000
+}
+
+# "1M tokens", "per 1K tokens", "/1m tok", "million tokens", "token", "1000 tokens", "MTok"
+_UNIT_RE = re.compile(
+    r"^(?:per\s+|/\s*)?([\d.,]*)\s*(k|thousand|m|million|b|billion)?\s*(?:tokens?|toks?)?$"
+)
+
+_COUNT_RE = re.compile(r"^([\d.]+)\s*(k|m)?$")
+
+def tokens_per_unit(unit: Optional[str]) -> Optional[int]:
+    """
+    Number of tokens a pricing unit covers, or None if it is not recognized.
+    A missing unit means DEFAULT_UNIT.
+    """
+    if unit is None:
+        unit = DEFAULT_UNIT
+    if not isinstance(unit, str):
+        return None
+    match = _UNIT_RE.match(unit.strip().lower())
+    if not match:
+        return None
+    count, scale = match.groups()
+    if not count and not scale and "tok" not in unit.lower():
+        return None
+    try:
+        count = float(count.replace(",", "")) if count else 1.0
+    except ValueError:
+        return None
+    tokens = count * _MULTIPLIERS[scale or ""]
+    return int(tokens) if tokens >= 1 else None
+
+def parse_price(value: Any) -> Optional[float]:
+    """
+    A price as a float ("$2.50" and "1,200" included), or None.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.strip().lstrip("$").replace(",", ""))
+        except ValueError:
+            return None
+    return None
+
+def price_per_token(value: Any, unit: Optional[str] = None) -> Optional[float]:
+    """
+    Normalizes a price quoted per `unit` to a price per single token.
+    """
+    price = parse_price(value)
+    tokens = tokens_per_unit(unit)
+    if price is None or tokens is None:
+        return None
+    return price / tokens
+
+def parse_token_count(value: Any) -> Optional[int]:
+    """
+    A token count such as a context window (128000, "128,000", "128k", "1M"), or None.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        match = _COUNT_RE.match(value.strip().lower().replace(",", ""))
+        if match:
+            count, scale = match.groups()
+            return int(float(count) * _MULTIPLIERS[scale or ""])
+    return None
+
+def field_value(fields: Dict[str, Any], name: str) -> Any:
+    """
+    The value of a serialized FieldMetadata in fields, or None if unset.
+    """
+    meta = fields.get(name)
+    return meta.get("value") if isinstance(meta, dict) else None
+
+def pricing_value(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The pricing dict ({"input", "output", "unit"}) of fields, or {}.
+    """
+    pricing = field_value(fields, "pricing")
+    return pricing if isinstance(pricing, dict) else {}
+
+def typed_columns(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Canonical numeric columns of a serialized RegistryEntryData: input and
+    output price per token and the context window, None where unknown.
+    """
+    fields = entry.get("fields") or {}
+    pricing = pricing_value(fields)
+    unit = pricing.get("unit")
+    return {
+        "input_price_per_token": price_per_token(pricing.get("input"), unit),
+        "output_price_per_token": price_per_token(pricing.get("output"), unit),
+        "context_window": parse_token_count(field_value(fields, "context_window"))
+    }
@@ -0,0 +1,169 @@
+"""
+Compares single-evaluate table extraction against the per-cell element
+handle fallback on saved HTML fixtures.
+
+    python benchmarks/bench_extraction.py --capture              # save the live pages as fixtures
+    python benchmarks/bench_extraction.py --repeat 5             # results -> benchmarks/results/
+    python benchmarks/bench_extraction.py --write-synthetic-fixtures
+
+Fixtures are the crawled pages as rendered by Chromium (<name>.html, from
+--capture). Where none has been captured, the synthetic fixture
+(<name>.synthetic.html: rows rebuilt from registry/latest.json in the markup
+the crawlers' selectors expect) is used instead, and the result says so.
+Synthetic pages lack the live sites' styling and extra markup, so only
+captured fixtures give representative numbers.
+"""
+import sys
+import os
+import argparse
+import html
+import json
+import platform
+import statistics
+import time
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from playwright.sync_api import sync_playwright
+from app.agents.extraction import extract_table
+from app.agents.crawl_profile import CrawlProfile
+from app.agents.browser_pool import DEFAULT_USER_AGENT
+from app.agents import price_crawler, leaderboard_crawler
+from bench_stream import git_commit, RESULTS_DIR
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# name -> (live URL, row selector, column spec, min cells)
+CASES = {
+    "pricepertoken": ("https://pricepertoken.com/", "tbody tr", price_crawler.TABLE_COLUMNS, 5),
+    "lmarena": ("https://lmarena.ai/leaderboard/text", "table tbody tr", leaderboard_crawler.TABLE_COLUMNS, 3),
+}
+
+def fixture_path(name: str, synthetic: bool = False) -> str:
+    return os.path.join(FIXTURES_DIR, f"{name}.synthetic.html" if synthetic else f"{name}.html")
+
+def launch(p, executable_path=None):
+    return p.chromium.launch(headless=True, executable_path=executable_path)
+
+def capture(executable_path=None):
+    """
+    Saves each live page, once its table has stopped growing, as a fixture.
+    """
+    with sync_playwright() as p:
+        browser = launch(p, executable_path)
+        page = browser.new_page(user_agent=DEFAULT_USER_AGENT)
+        for name, (url, row_selector, _, _) in CASES.items():
+            page.goto(url, wait_until="domcontentloaded", timeout=60000)
+            page.wait_for_selector(row_selector, timeout=30000)
+            rows = CrawlProfile().wait_for_rows(page, row_selector)
+            with open(fixture_path(name), "w", encoding="utf-8") as f:
+                f.write(page.content())
+            print(f"{name}: saved {url} ({rows} rows) to {fixture_path(name)}")
+        browser.close()
+
+def _page(rows_html: str) -> str:
+    return f"<html><body><table><thead><tr><th></th></tr></thead><tbody>\n{rows_html}</tbody></table></body></html>\n"
+
+def write_synthetic_fixtures():
+    """
+    Builds the synthetic fixtures from the checked-in registry snapshot,
+    using the markup the crawlers' selectors expect on the live pages.
+    """
+    with open("registry/latest.json", "r", encoding="utf-8") as f:
+        registry = json.load(f)
+
+    rows = []
+    for item in registry:
+        pricing = (item["fields"].get("pricing") or {}).get("value", {})
+        ctx = (item["fields"].get("context_window") or {}).get("value", 0)
+        rows.append(
+            "<tr>"
+            f"<td><a href=\"#\"><img alt=\"\"><span>{html.escape(item['provider'].title())}</span></a></td>"
+            f"<td><a href=\"#\">{html.escape(item['model'])}</a></td>"
+            f"<td><span>{ctx // 1000}K</span></td>"
+            f"<td><span>${pricing.get('input', 0):.3f}</span></td>"
+            f"<td><span>${pricing.get('output', 0):.3f}</span></td>"
+            "</tr>\n"
+        )
+    with open(fixture_path("pricepertoken", synthetic=True), "w", encoding="utf-8") as f:
+        f.write(_page("".join(rows)))
+
+    rows = []
+    for rank, item in enumerate(registry, start=1):
+        rows.append(
+            "<tr>"
+            f"<td>{rank}</td>"
+            f"<td><div><a href=\"#\">{html.escape(item['model'])}</a></div></td>"
+            f"<td>{1500 - rank}</td>"
+            f"<td>+{rank % 9 + 3} / -{rank % 7 + 3}</td>"
+            "</tr>\n"
+        )
+    with open(fixture_path("lmarena", synthetic=True), "w", encoding="utf-8") as f:
+        f.write(_page("".join(rows)))
+    print(f"Fixtures written to {FIXTURES_DIR}")
+
+def run(repeat: int, executable_path=None):
+    results = {}
+    with sync_playwright() as p:
+        browser = launch(p, executable_path)
+        page = browser.new_page()
+        # Captured pages are inert here: scripts and external resources are not loaded
+        page.route("**/*", lambda route: route.abort())
+        for name, (_, row_selector, columns, min_cells) in CASES.items():
+            synthetic = not os.path.exists(fixture_path(name))
+            with open(fixture_path(name, synthetic), "r", encoding="utf-8") as f:
+                page.set_content(f.read(), wait_until="domcontentloaded")
+
+            timings = {}
+            outputs = {}
+            for mode in ("evaluate", "dom"):
+                samples = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    outputs[mode] = extract_table(page, row_selector, columns, min_cells, mode=mode)
+                    samples.append(time.perf_counter() - start)
+                timings[mode] = statistics.median(samples) * 1000
+
+            agree = outputs["evaluate"] == outputs["dom"]
+            if not agree:
+                print(f"ERROR: {name}: evaluate and dom extraction disagree")
+
+            results[name] = {
+                "fixture": "synthetic" if synthetic else "captured",
+                "agree": agree,
+                "rows": len(outputs["evaluate"]),
+                "evaluate_ms": round(timings["evaluate"], 2),
+                "dom_ms": round(timings["dom"], 2),
+                "speedup": round(timings["dom"] / timings["evaluate"], 1),
+            }
+            print(f"{name} ({results[name]['fixture']}): {results[name]['rows']} rows | evaluate {results[name]['evaluate_ms']} ms | "
+                  f"dom {results[name]['dom_ms']} ms | x{results[name]['speedup']}")
+        browser.close()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--capture", action="store_true", help="Save the live pages as fixtures")
+    parser.add_argument("--write-synthetic-fixtures", action="store_true")
+    parser.add_argument("--executable-path", help="Chromium binary to use instead of Playwright's")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/extraction-<commit>.json)")
+    args = parser.parse_args()
+
+    if args.write_synthetic_fixtures:
+        write_synthetic_fixtures()
+    elif args.capture:
+        capture(args.executable_path)
+    else:
+        results = run(args.repeat, args.executable_path)
+        result = {**git_commit(), "python": platform.python_version(), "repeat": args.repeat, "results": results}
+        output = args.output
+        if not output:
+            os.makedirs(RESULTS_DIR, exist_ok=True)
+            output = os.path.join(RESULTS_DIR, f"extraction-{(result['commit'] or 'unknown')[:10]}.json")
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {output}")
+        if not all(r["agree"] for r in results.values()):
+            sys.exit(1)
@@ -0,0 +1,217 @@
+"""
+Micro-benchmarks for the per-message hot paths: Normalizer.normalize,
+SemanticDiff.compute_diff, compute_hash and compute_entry_hash, each on a
+small, a large and a deeply nested entry. *_record cases run the same work
+on EntryRecords, as the stream worker does.
+
+    python benchmarks/bench_hotpaths.py                      # print results
+    python benchmarks/bench_hotpaths.py --save-baseline      # store a baseline
+    python benchmarks/bench_hotpaths.py --check --threshold 0.15
+
+Reports ops/sec (best of --repeat timeit runs) and the peak memory
+allocated by a single call (tracemalloc). --check exits with status 1 when
+a benchmark is more than --threshold slower, or allocates that much more,
+than the stored baseline. Baselines are machine-specific and kept out of git
+under benchmarks/results/.
+"""
+import sys
+import os
+import argparse
+import json
+import platform
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.ingestion.normalizer import Normalizer
+from app.diff.semantic_diff import SemanticDiff
+from app.models.registry import RegistryEntryData, EntryRecord
+from app.utils.hashing import compute_hash, compute_entry_hash, compute_entry_digests
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, "hotpaths-baseline.json")
+TIMESTAMP = "2026-01-17T11:53:36.140328+00:00"
+SOURCE = "https://pricepertoken.com/"
+
+def _nested(depth: int, price: float) -> Dict[str, Any]:
+    node: Dict[str, Any] = {"input": price, "output": price * 2, "unit": "1M tokens"}
+    for level in range(depth):
+        node = {"tier": f"level-{level}", "threshold": 1000 * (level + 1), "rates": node, "regions": ["us", "eu"]}
+    return node
+
+def raw_items() -> Dict[str, Dict[str, Any]]:
+    """
+    Agent payloads as pushed to the stream.
+    """
+    return {
+        "small": {
+            "provider": "openai", "model_name": "gpt-4o-mini", "source": SOURCE,
+            "pricing": {"input": 0.15, "output": 0.6, "unit": "1M tokens"}
+        },
+        "large": {
+            "provider": "openai", "model_name": "gpt-4o", "source": SOURCE,
+            "pricing": {
+                "input": 2.5, "output": 10.0, "unit": "1M tokens",
+                "cached_input": 1.25, "batch_input": 1.25, "batch_output": 5.0,
+                "tiers": [{"above": n * 100000, "input": 2.5 + n, "output": 10.0 + n} for n in range(20)]
+            },
+            "context_window": 128000,
+            "description": "x" * 2000
+        },
+        "nested": {
+            "provider": "google", "model_name": "gemini-1.5-pro", "source": SOURCE,
+            "pricing": _nested(8, 1.25),
+            "context_window": 2000000
+        }
+    }
+
+def _meta(value: Any, conflicts: int = 0) -> Dict[str, Any]:
+    return {
+        "value": value,
+        "sources": [SOURCE, "https://openrouter.ai/"],
+        "last_verified": TIMESTAMP,
+        "confidence": 0.9,
+        "conflicts": [
+            {"source": f"https://mirror{n}.example/", "value": value, "timestamp": TIMESTAMP, "reason": "rounding"}
+            for n in range(conflicts)
+        ]
+    }
+
+def entries() -> Dict[str, RegistryEntryData]:
+    """
+    Normalized entries in the shape stored in registry_entries.data.
+    """
+    raw = raw_items()
+    large_fields = {
+        "pricing": _meta(raw["large"]["pricing"], conflicts=5),
+        "context_window": _meta(128000, conflicts=2),
+        "rate_limits": _meta({"rpm": 10000, "tpm": 30000000, "tiers": {f"tier-{n}": n * 500 for n in range(10)}}),
+        "capabilities": _meta(["vision", "tools", "json_mode", "streaming", "audio", "batch"]),
+        "modalities": _meta({"input": ["text", "image", "audio"], "output": ["text"]})
+    }
+    return {
+        "small": RegistryEntryData(provider="openai", model="gpt-4o-mini", fields={"pricing": _meta(raw["small"]["pricing"])}),
+        "large": RegistryEntryData(provider="openai", model="gpt-4o", fields=large_fields),
+        "nested": RegistryEntryData(provider="google", model="gemini-1.5-pro", fields={
+            "pricing": _meta(raw["nested"]["pricing"]),
+            "context_window": _meta(2000000)
+        })
+    }
+
+def _changed(entry: RegistryEntryData) -> RegistryEntryData:
+    data = entry.model_dump(mode='json', exclude_unset=True)
+    pricing = data["fields"]["pricing"]["value"]
+    while "rates" in pricing:
+        pricing = pricing["rates"]
+    pricing["input"] = pricing["input"] * 1.1
+    return RegistryEntryData(**data)
+
+def cases() -> Dict[str, Callable[[], Any]]:
+    normalizer = Normalizer()
+    diff_engine = SemanticDiff()
+    raw = raw_items()
+    old_entries = entries()
+
+    benchmarks = {}
+    for size in ("small", "large", "nested"):
+        item, old = raw[size], old_entries[size]
+        new = _changed(old)
+        dumped = new.model_dump(mode='json')
+        benchmarks[f"normalize/{size}"] = lambda item=item: normalizer.normalize(item, item["provider"])
+        benchmarks[f"diff/{size}"] = lambda old=old, new=new: diff_engine.compute_diff(old, new)
+        benchmarks[f"hash/{size}"] = lambda item=item: compute_hash(item)
+        benchmarks[f"entry_hash/{size}"] = lambda new=new: compute_entry_hash(new.model_dump(mode='json'))
+        benchmarks[f"entry_hash_dumped/{size}"] = lambda dumped=dumped: compute_entry_hash(dumped)
+        # Worker fast path: slotted records, no pydantic after the payload boundary
+        old_record, new_record = EntryRecord.from_model(old), EntryRecord.from_model(new)
+        benchmarks[f"normalize_record/{size}"] = lambda item=item: normalizer.normalize_record(item, item["provider"])
+        benchmarks[f"diff_record/{size}"] = lambda old=old_record, new=new_record: diff_engine.compute_diff(old, new)
+        benchmarks[f"entry_hash_record/{size}"] = lambda new=new_record: compute_entry_hash(new.to_dict())
+        # Stored digests on the old side, digests from hashing on the new side
+        old_digested = EntryRecord.from_model(old)
+        old_digested.digests = compute_entry_digests(old_digested.to_dict())[1]
+        new_digested = EntryRecord.from_model(new)
+        new_digested.digests = compute_entry_digests(new_digested.to_dict())[1]
+        benchmarks[f"diff_record_digests/{size}"] = lambda old=old_digested, new=new_digested: diff_engine.compute_diff(old, new)
+        benchmarks[f"load_stored/{size}"] = lambda dumped=dumped: RegistryEntryData(**dumped)
+        benchmarks[f"load_stored_record/{size}"] = lambda dumped=dumped: EntryRecord.from_stored(dumped)
+    return benchmarks
+
+def measure(func: Callable[[], Any], repeat: int, alloc_calls: int = 20) -> Dict[str, float]:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    func()  # warm caches before tracing
+    tracemalloc.start()
+    peaks = []
+    for _ in range(alloc_calls):
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        func()
+        peaks.append(tracemalloc.get_traced_memory()[1] - start)
+    tracemalloc.stop()
+
+    return {
+        "ops_per_sec": round(1 / best, 1),
+        "us_per_op": round(best * 1e6, 3),
+        "alloc_peak_bytes": sorted(peaks)[len(peaks) // 2]
+    }
+
+def run(repeat: int, only: str = "") -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, func in cases().items():
+        if only and only not in name:
+            continue
+        results[name] = measure(func, repeat)
+        r = results[name]
+        print(f"{name:28} {r['ops_per_sec']:>12,.0f} ops/s {r['us_per_op']:>10.2f} us/op {r['alloc_peak_bytes']:>10,} B peak")
+    return results
+
+def check(baseline: Dict[str, Any], results: Dict[str, Dict[str, float]], threshold: float) -> bool:
+    """
+    Returns False if any benchmark regressed by more than threshold
+    (fractional) in speed or per-call allocations.
+    """
+    ok = True
+    for name, current in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        slower = 1 - current["ops_per_sec"] / base["ops_per_sec"]
+        bigger = (current["alloc_peak_bytes"] - base["alloc_peak_bytes"]) / max(base["alloc_peak_bytes"], 1)
+        if slower > threshold or bigger > threshold:
+            ok = False
+            print(f"REGRESSION {name}: ops/s {base['ops_per_sec']} -> {current['ops_per_sec']} ({-slower:+.1%}), "
+                  f"alloc {base['alloc_peak_bytes']} -> {current['alloc_peak_bytes']} B ({bigger:+.1%})")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="Fail if the baseline regressed")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed regression (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.filter)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "results": results}, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            sys.exit(f"No baseline at {args.baseline}; run with --save-baseline first")
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not check(baseline, results, args.threshold):
+            sys.exit(1)
+        print(f"No regressions over {args.threshold:.0%}.")
@@ -0,0 +1,283 @@
+"""
+End-to-end benchmark of the stream pipeline: synthetic agent payloads are
+pushed to stream:ingestion and drained by a StreamWorker.
+
+Round 1 inserts every model; each further round re-publishes all of them
+with --change-ratio of the prices changed, which exercises the unchanged
+short-circuit as well as the diff / write path.
+
+    python benchmarks/bench_stream.py --models 10000 --rounds 3 --change-ratio 0.1
+    python benchmarks/bench_stream.py --backend live          # REDIS_URL / DATABASE_URL
+    python benchmarks/bench_stream.py --compare benchmarks/results/stream-<sha>.json
+
+--backend memory (default) runs against fakeredis and a temporary SQLite
+database in-process (pip install fakeredis). --backend live uses the
+configured Redis and Postgres; point them at scratch instances with no
+other workers running, since the benchmark joins ingestion_group and writes
+bench-* providers to the registry and history tables.
+
+Results (messages/sec, p50/p99 dequeue-to-ACK latency per message, peak RSS)
+are written as JSON tagged with the current commit.
+"""
+import sys
+import os
+import argparse
+import contextlib
+import json
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+
+# Add project root to sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+BENCH_PROVIDERS = ["bench-openai", "bench-anthropic", "bench-google", "bench-meta", "bench-mistral", "bench-liquid"]
+
+def setup_memory_backend(db_path: str):
+    """
+    Points the app at fakeredis and a SQLite file. Must run before any
+    module that binds get_redis / SessionLocal at import time is imported.
+    """
+    try:
+        import fakeredis
+    except ImportError:
+        sys.exit("--backend memory needs fakeredis (pip install fakeredis)")
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    from sqlalchemy.ext.compiler import compiles
+    from sqlalchemy.dialects.postgresql import JSONB
+    from sqlalchemy.schema import CreateColumn, PrimaryKeyConstraint
+
+    @compiles(JSONB, "sqlite")
+    def _jsonb_as_json(type_, compiler, **kw):
+        return "JSON"
+
+    # SQLite cannot auto-increment the (id, timestamp) key the partitioned
+    # history table has on PostgreSQL, so key it on id alone here
+    @compiles(CreateColumn, "sqlite")
+    def _history_id_as_rowid(element, compiler, **kw):
+        column = element.element
+        if column.table.name == "history_entries" and column.name == "id":
+            return "id INTEGER PRIMARY KEY AUTOINCREMENT"
+        return compiler.visit_create_column(element, **kw)
+
+    @compiles(PrimaryKeyConstraint, "sqlite")
+    def _history_primary_key(constraint, compiler, **kw):
+        if constraint.table.name == "history_entries":
+            return ""
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+
+    import app.storage.redis
+    server = fakeredis.FakeServer()
+    app.storage.redis.get_redis = lambda: fakeredis.FakeRedis(server=server, decode_responses=True)
+
+def git_commit() -> dict:
+    def git(*args):
+        try:
+            return subprocess.check_output(["git", *args], cwd=ROOT, stderr=subprocess.DEVNULL, text=True).strip()
+        except Exception:
+            return ""
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def percentile(samples, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def make_models(count: int, rng: random.Random):
+    """
+    Agent-shaped items like the ones behind registry/latest.json.
+    """
+    models = []
+    for i in range(count):
+        price = round(rng.uniform(0.01, 30.0), 3)
+        models.append({
+            "provider": BENCH_PROVIDERS[i % len(BENCH_PROVIDERS)],
+            "model_name": f"bench-model-{i}",
+            "pricing": {"input": price, "output": round(price * rng.choice((2, 3, 4, 5)), 3), "unit": "1M tokens"},
+            "context_window": rng.choice((8000, 32000, 128000, 200000, 1000000)),
+            "source": "https://pricepertoken.com/"
+        })
+    return models
+
+def mutate(models, change_ratio: float, rng: random.Random) -> int:
+    changed = rng.sample(range(len(models)), int(len(models) * change_ratio))
+    for i in changed:
+        pricing = models[i]["pricing"]
+        pricing["input"] = round(pricing["input"] * rng.uniform(0.5, 1.5), 3)
+        pricing["output"] = round(pricing["output"] * rng.uniform(0.5, 1.5), 3)
+    return len(changed)
+
+def run_round(worker, redis_client, stream_key: str, models, chunk: int, quiet: bool) -> dict:
+    """
+    Publishes the models chunk by chunk and drains each chunk with the
+    worker. Latency is measured per message from dequeue to ACK; in batch
+    mode every message of a batch gets that batch's handling time.
+    """
+    latencies = []
+    publish_seconds = 0.0
+    process_seconds = 0.0
+    count = worker.batch_size if worker.batch_mode else 10
+    sink = open(os.devnull, "w") if quiet else sys.stdout
+
+    for start in range(0, len(models), chunk):
+        items = models[start:start + chunk]
+        t0 = time.perf_counter()
+        pipe = redis_client.pipeline(transaction=False)
+        for item in items:
+            pipe.xadd(stream_key, {"payload": json.dumps(item), "published_at": f"{time.time():.3f}"})
+        pipe.execute()
+        publish_seconds += time.perf_counter() - t0
+
+        remaining = len(items)
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(sink):
+            while remaining > 0:
+                rows = worker.read_rows(min(count, remaining))
+                if not rows:
+                    break
+                if worker.batch_mode:
+                    started = time.perf_counter()
+                    worker.handle_rows(rows)
+                    latencies.extend([time.perf_counter() - started] * len(rows))
+                else:
+                    dequeued_at = time.time()
+                    for message_id, message_data in rows:
+                        started = time.perf_counter()
+                        worker.process_message(message_id, message_data, dequeued_at)
+                        latencies.append(time.perf_counter() - started)
+                remaining -= len(rows)
+        process_seconds += time.perf_counter() - t0
+
+    if sink is not sys.stdout:
+        sink.close()
+    return {
+        "messages": len(models),
+        "publish_msgs_per_sec": round(len(models) / publish_seconds, 1) if publish_seconds else None,
+        "process_msgs_per_sec": round(len(models) / process_seconds, 1) if process_seconds else None,
+        "latency_p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "latency_p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "latency_mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+def reset_bench_data(redis_client):
+    """
+    Removes rows, value hashes and applied versions left by earlier runs on a live backend.
+    """
+    from app.storage.postgres import SessionLocal
+    from app.models.registry import RegistryEntry
+    from app.models.history import HistoryEntry
+    from app.ingestion.state_manager import ENTRY_HASHES_KEY, ENTRY_VERSIONS_KEY
+
+    db = SessionLocal()
+    try:
+        for model in (RegistryEntry, HistoryEntry):
+            db.query(model).filter(model.provider.in_(BENCH_PROVIDERS)).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    for key in (ENTRY_HASHES_KEY, ENTRY_VERSIONS_KEY):
+        fields = [f for f in redis_client.hkeys(key) if f.startswith("bench-")]
+        if fields:
+            redis_client.hdel(key, *fields)
+
+def run(args) -> dict:
+    from app.config import settings
+    from app.storage.postgres import Base, engine
+    from app.storage.redis import get_redis
+    from app.models import registry, history  # noqa: F401  (registers tables)
+    from app.ingestion.stream_worker import StreamWorker, STREAM_KEY
+
+    Base.metadata.create_all(bind=engine)
+    redis_client = get_redis()
+    if args.backend == "live":
+        reset_bench_data(redis_client)
+
+    worker = StreamWorker(batch_size=args.batch_size, consumer_name=f"bench-{os.getpid()}")
+    worker.batch_mode = not args.per_message
+
+    rng = random.Random(args.seed)
+    models = make_models(args.models, rng)
+
+    rounds = []
+    for number in range(1, args.rounds + 1):
+        changed = len(models) if number == 1 else mutate(models, args.change_ratio, rng)
+        result = run_round(worker, redis_client, STREAM_KEY, models, args.chunk, not args.verbose)
+        result.update(round=number, changed=changed)
+        rounds.append(result)
+        print(f"round {number}: {result['messages']} msgs ({changed} changed) | "
+              f"{result['process_msgs_per_sec']} msg/s | p50 {result['latency_p50_ms']} ms | "
+              f"p99 {result['latency_p99_ms']} ms | peak RSS {result['peak_rss_mb']} MB")
+
+    return {
+        **git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "params": {
+            "backend": args.backend,
+            "models": args.models,
+            "rounds": args.rounds,
+            "change_ratio": args.change_ratio,
+            "batch_mode": worker.batch_mode,
+            "batch_size": worker.batch_size,
+            "coalesce": settings.WORKER_COALESCE,
+            "chunk": args.chunk,
+            "seed": args.seed
+        },
+        "rounds": rounds,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+def compare(baseline: dict, current: dict):
+    print(f"Compared with {baseline.get('commit', '?')[:10]} ({baseline.get('timestamp', '?')}):")
+    for old, new in zip(baseline["rounds"], current["rounds"]):
+        for metric in ("process_msgs_per_sec", "latency_p50_ms", "latency_p99_ms", "peak_rss_mb"):
+            if old.get(metric) and new.get(metric) is not None:
+                change = (new[metric] - old[metric]) / old[metric] * 100
+                print(f"  round {new['round']} {metric}: {old[metric]} -> {new[metric]} ({change:+.1f}%)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("memory", "live"), default="memory")
+    parser.add_argument("--models", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--change-ratio", type=float, default=0.1)
+    parser.add_argument("--batch-size", type=int, default=None, help="Default: WORKER_BATCH_SIZE")
+    parser.add_argument("--per-message", action="store_true", help="Disable batch mode")
+    parser.add_argument("--chunk", type=int, default=10000, help="Messages published before each drain")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/stream-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Keep the worker's per-entry output")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.backend == "memory":
+            setup_memory_backend(os.path.join(tmp, "bench.sqlite"))
+        result = run(args)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"stream-{(result['commit'] or 'unknown')[:10]}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), result)
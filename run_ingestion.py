@@ -1,17 +1,24 @@
+from app.config import settings
 from app.agents.price_crawler import PriceCrawlerAgent
 from app.ingestion.orchestrator import IngestionOrchestrator
 
 def check_and_run_ingestion():
     """
     Orchestrates the crawling process by triggering agents.
-    Data is pushed to Redis Stream for the worker to process.
+    Agents run concurrently; data is pushed to Redis Stream for the worker to process.
     """
     print("Starting ingestion trigger...")
     
     orchestrator = IngestionOrchestrator()
     
-    # 1. Price Crawler
-    crawler = PriceCrawlerAgent()
-    orchestrator.run_agent(crawler)
+    # APIIntrospectionAgent / CommunitySignalAgent are still stubs; add them here once they fetch real data
+    agents = [
+        PriceCrawlerAgent(),
+    ]
+    results = orchestrator.run_agents(agents, timeout=settings.INGESTION_AGENT_TIMEOUT)
     
     print("Ingestion triggered. Check worker logs for processing status.")
+    return results
+
+if __name__ == "__main__":
+    check_and_run_ingestion()
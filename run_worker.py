@@ -1,5 +1,18 @@
-from app.ingestion.stream_worker import StreamWorker
+import argparse
+import asyncio
 
 if __name__ == "__main__":
-    worker = StreamWorker()
-    worker.run()
+    parser = argparse.ArgumentParser(description="Run a stream worker.")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Use the asyncio worker (concurrent messages in one process)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve Prometheus metrics on this port (default: WORKER_METRICS_PORT)")
+    args = parser.parse_args()
+
+    if args.use_async:
+        from app.ingestion.async_stream_worker import AsyncStreamWorker
+        asyncio.run(AsyncStreamWorker().run(metrics_port=args.metrics_port))
+    else:
+        from app.ingestion.stream_worker import StreamWorker
+        worker = StreamWorker()
+        worker.run(metrics_port=args.metrics_port)
@@ -0,0 +1,50 @@
+import argparse
+import multiprocessing
+import os
+import socket
+import time
+
+from app.config import settings
+from app.ingestion.stream_worker import StreamWorker
+
+def start_worker(index: int, metrics_port: int):
+    # Each process gets its own consumer identity inside ingestion_group
+    consumer_name = f"{socket.gethostname()}-{index}-{os.getpid()}"
+    worker = StreamWorker(consumer_name=consumer_name)
+    # Worker i serves metrics on metrics_port + i
+    worker.run(metrics_port=metrics_port + index if metrics_port else 0)
+
+def spawn(index: int, metrics_port: int = 0) -> multiprocessing.Process:
+    process = multiprocessing.Process(target=start_worker, args=(index, metrics_port), name=f"stream-worker-{index}")
+    process.start()
+    return process
+
+def supervise(num_workers: int, metrics_port: int = 0):
+    """
+    Starts num_workers StreamWorker processes and restarts any that exit.
+    Messages left pending by a dead worker are reclaimed by its peers.
+    """
+    print(f"Starting {num_workers} stream workers...")
+    processes = {i: spawn(i, metrics_port) for i in range(num_workers)}
+    try:
+        while True:
+            time.sleep(1)
+            for i, process in processes.items():
+                if not process.is_alive():
+                    print(f"Worker {i} exited with code {process.exitcode}, restarting...")
+                    processes[i] = spawn(i, metrics_port)
+    except KeyboardInterrupt:
+        print("Stopping stream workers...")
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run several stream workers in one consumer group.")
+    parser.add_argument("-n", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--metrics-port", type=int, default=settings.WORKER_METRICS_PORT,
+                        help="First metrics port; worker i listens on port + i (0 = off)")
+    args = parser.parse_args()
+    supervise(args.workers, args.metrics_port)
@@ -0,0 +1,96 @@
+import sys
+import os
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select, update, func, tuple_
+from app.config import settings
+from app.storage.postgres import engine
+from app.models.history import HistoryEntry, ensure_history_partitions, add_months
+
+def _redundant_snapshots(start: datetime, end: datetime):
+    """
+    (id, timestamp) of rows in [start, end) whose snapshot is not the last
+    one of its model and day.
+    """
+    # Bucket by UTC day, matching the UTC cutoff and month bounds whatever the session time zone
+    timestamp = HistoryEntry.timestamp
+    if engine.dialect.name == "postgresql":
+        timestamp = func.timezone("UTC", timestamp)
+    day = func.date(timestamp)
+    ranked = select(
+        HistoryEntry.id,
+        HistoryEntry.timestamp,
+        func.row_number().over(
+            partition_by=(HistoryEntry.provider, HistoryEntry.model, day),
+            order_by=(HistoryEntry.timestamp.desc(), HistoryEntry.id.desc())
+        ).label("rank")
+    ).where(
+        HistoryEntry.timestamp >= start,
+        HistoryEntry.timestamp < end,
+        HistoryEntry.snapshot.isnot(None)
+    ).subquery()
+    return select(ranked.c.id, ranked.c.timestamp).where(ranked.c.rank > 1)
+
+def compact_history(retention_days: Optional[int] = None, dry_run: bool = False) -> int:
+    """
+    Thins snapshots older than retention_days to daily checkpoints: the last
+    snapshot of each model and day is kept, the others are set to NULL.
+    Diffs are never touched. Works one month (one partition) per transaction
+    and only on whole days, so it is safe to re-run. Returns the number of
+    snapshots removed (or that would be, with dry_run).
+    """
+    retention_days = settings.HISTORY_SNAPSHOT_RETENTION_DAYS if retention_days is None else retention_days
+    now = datetime.now(timezone.utc)
+    cutoff = (now - timedelta(days=retention_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    with engine.connect() as conn:
+        oldest = conn.execute(
+            select(func.min(HistoryEntry.timestamp)).where(
+                HistoryEntry.timestamp < cutoff,
+                HistoryEntry.snapshot.isnot(None)
+            )
+        ).scalar()
+    if oldest is None:
+        return 0
+    if oldest.tzinfo is None:
+        oldest = oldest.replace(tzinfo=timezone.utc)
+
+    total = 0
+    month = datetime(oldest.year, oldest.month, 1, tzinfo=timezone.utc)
+    while month < cutoff:
+        end = min(datetime.combine(add_months(month.date(), 1), datetime.min.time(), timezone.utc), cutoff)
+        redundant = _redundant_snapshots(month, end)
+        with engine.begin() as conn:
+            if dry_run:
+                count = conn.execute(select(func.count()).select_from(redundant.subquery())).scalar()
+            else:
+                count = conn.execute(
+                    update(HistoryEntry)
+                    .where(tuple_(HistoryEntry.id, HistoryEntry.timestamp).in_(redundant))
+                    .values(snapshot=None)
+                ).rowcount
+        if count:
+            print(f"{month:%Y-%m}: {'would clear' if dry_run else 'cleared'} {count} snapshots")
+        total += count
+        month = end
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create upcoming history partitions and thin old snapshots to daily checkpoints.")
+    parser.add_argument("--retention-days", type=int, default=None,
+                        help="Keep every snapshot newer than this (default: HISTORY_SNAPSHOT_RETENTION_DAYS)")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the snapshots that would be cleared")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        ensure_history_partitions(conn)
+
+    count = compact_history(args.retention_days, args.dry_run)
+    print(f"{'Would clear' if args.dry_run else 'Cleared'} {count} snapshots.")
+    if count and not args.dry_run and engine.dialect.name == "postgresql":
+        print("Space is reused by new rows after autovacuum; run VACUUM history_entries to reclaim it sooner.")
@@ -5,19 +5,7 @@ import json
 # Add project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app.storage.postgres import SessionLocal, create_tables, upsert_model, clear_leaderboard, insert_leaderboard_entry
-
-def safe_float(val):
-    try:
-        return float(val)
-    except:
-        return 0.0
-
-def safe_int(val):
-    try:
-        return int(val.replace(',',''))
-    except:
-        return 0
+from app.storage.postgres import SessionLocal, create_tables, bulk_upsert_models, replace_leaderboard, flatten_registry_entry
 
 def migrate_registry():
     print("Migrating Registry (registry/latest.json)...")
@@ -31,32 +19,13 @@ def migrate_registry():
 
     db = SessionLocal()
     try:
-        count = 0
+        models = []
         for item in data:
-            name = item.get('model')
-            if not name: continue
-            
-            provider = item.get('provider', 'Unknown')
-            
-            # Extract fields
-            pricing = item.get('fields', {}).get('pricing', {}).get('value', {})
-            inp = safe_float(pricing.get('input', 0))
-            out = safe_float(pricing.get('output', 0))
-            
-            ctx = item.get('fields', {}).get('context_window', {}).get('value', 0)
-            if isinstance(ctx, str): ctx = safe_int(ctx)
-            
-            model_data = {
-                'name': name,
-                'provider': provider,
-                'input_price': inp,
-                'output_price': out,
-                'context_window': ctx,
-                'config': item  # Store full original JSON for backup/extra fields
-            }
-            
-            upsert_model(db, model_data)
-            count += 1
+            model_data = flatten_registry_entry(item)
+            if model_data:
+                models.append(model_data)
+
+        count = bulk_upsert_models(db, models)
         print(f"Successfully migrated {count} models.")
     except Exception as e:
         print(f"Error migrating registry: {e}")
@@ -75,8 +44,7 @@ def migrate_leaderboard():
 
     db = SessionLocal()
     try:
-        clear_leaderboard(db) # Reset leaderboard on migration
-        count = 0
+        entries = []
         for item in data:
             try:
                 # Ensure rank is int
@@ -96,12 +64,12 @@ def migrate_leaderboard():
                     'ci_95': item.get('ci_95'),
                     'category': item.get('category', 'Overall')
                 }
-                insert_leaderboard_entry(db, entry)
-                count += 1
+                entries.append(entry)
             except Exception as e:
                 print(f"Skipping row: {item} | Error: {e}")
-        
-        db.commit()
+
+        # Replaces the previous leaderboard in one transaction
+        count = replace_leaderboard(db, entries)
         print(f"Successfully migrated {count} leaderboard entries.")
     except Exception as e:
         print(f"Error migrating leaderboard: {e}")
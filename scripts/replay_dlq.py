@@ -0,0 +1,44 @@
+import sys
+import os
+import argparse
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.ingestion.dead_letter import DeadLetterQueue
+from app.ingestion.stream_worker import STREAM_KEY, CONSUMER_GROUP
+
+def list_entries(dlq, limit):
+    rows = dlq.entries(count=limit)
+    if not rows:
+        print("DLQ is empty.")
+        return
+    for dlq_id, data in rows:
+        print(f"{dlq_id} | message {data.get('message_id')} | {data.get('deliveries')} deliveries | "
+              f"{data.get('failed_at')} | {data.get('error')}")
+    print(f"{len(rows)} entries shown.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"Inspect and replay the {STREAM_KEY} dead-letter queue.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = sub.add_parser("list", help="Show dead-lettered messages")
+    list_parser.add_argument("--limit", type=int, default=100)
+
+    for name, help_text in (("replay", "Re-publish messages to the ingestion stream"), ("purge", "Delete messages from the DLQ")):
+        command = sub.add_parser(name, help=help_text)
+        target = command.add_mutually_exclusive_group(required=True)
+        target.add_argument("--id", dest="ids", action="append", help="DLQ entry id (repeatable)")
+        target.add_argument("--all", action="store_true")
+
+    args = parser.parse_args()
+    dlq = DeadLetterQueue(STREAM_KEY, CONSUMER_GROUP)
+
+    if args.command == "list":
+        list_entries(dlq, args.limit)
+    elif args.command == "replay":
+        count = dlq.replay(None if args.all else args.ids)
+        print(f"Replayed {count} messages to {STREAM_KEY}.")
+    elif args.command == "purge":
+        count = dlq.purge(None if args.all else args.ids)
+        print(f"Purged {count} messages from the DLQ.")
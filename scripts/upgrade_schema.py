@@ -0,0 +1,147 @@
+import sys
+import os
+from datetime import timezone
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text, tuple_
+from app.storage.postgres import engine, create_tables, SessionLocal, bulk_upsert_models, flatten_registry_entry
+from app.models.registry import RegistryEntry
+from app.utils.hashing import compute_entry_digests, stored_digests
+from app.models.history import HistoryEntry, ensure_history_partitions
+
+# Idempotent DDL for databases created before a column/index existed.
+# create_all() only creates missing tables, so changes to existing tables go here.
+UPGRADES = [
+    "ALTER TABLE history_entries ADD COLUMN IF NOT EXISTS trace_id VARCHAR",
+    "CREATE INDEX IF NOT EXISTS ix_history_entries_trace_id ON history_entries (trace_id)",
+    "ALTER TABLE registry_entries ADD COLUMN IF NOT EXISTS digests JSONB",
+    "ALTER TABLE registry_entries ADD COLUMN IF NOT EXISTS input_price_per_token DOUBLE PRECISION",
+    "ALTER TABLE registry_entries ADD COLUMN IF NOT EXISTS output_price_per_token DOUBLE PRECISION",
+    "ALTER TABLE registry_entries ADD COLUMN IF NOT EXISTS context_window BIGINT",
+    "CREATE INDEX IF NOT EXISTS ix_registry_input_price ON registry_entries (input_price_per_token)",
+    "CREATE INDEX IF NOT EXISTS ix_registry_output_price ON registry_entries (output_price_per_token)",
+    "CREATE INDEX IF NOT EXISTS ix_registry_context_window ON registry_entries (context_window)",
+    "CREATE INDEX IF NOT EXISTS ix_registry_input_price_context ON registry_entries (input_price_per_token, context_window)",
+    "CREATE INDEX IF NOT EXISTS ix_registry_provider_input_price ON registry_entries (provider, input_price_per_token)",
+    "CREATE INDEX IF NOT EXISTS ix_registry_data_gin ON registry_entries USING gin (data)",
+]
+
+def partition_history() -> bool:
+    """
+    Converts a history_entries table created before partitioning into the
+    monthly partitioned layout, copying every row, in one transaction.
+    History writes wait on the table lock until it commits. Returns False
+    if there was nothing to convert (already partitioned, or not PostgreSQL).
+    """
+    if engine.dialect.name != "postgresql":
+        return False
+    with engine.begin() as conn:
+        kind = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('history_entries')")).scalar()
+        if kind != "r":
+            return False
+
+        conn.execute(text("ALTER TABLE history_entries RENAME TO history_entries_legacy"))
+        # Free the index and sequence names the partitioned table is created with
+        indexes = conn.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = 'history_entries_legacy'")).scalars().all()
+        for index in indexes:
+            conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index}_legacy"'))
+        conn.execute(text("ALTER SEQUENCE IF EXISTS history_entries_id_seq RENAME TO history_entries_legacy_id_seq"))
+
+        HistoryEntry.__table__.create(conn)
+        oldest = conn.execute(text("SELECT min(timestamp) FROM history_entries_legacy")).scalar()
+        if oldest is not None:
+            ensure_history_partitions(conn, start=oldest.astimezone(timezone.utc).date())
+
+        conn.execute(text(
+            "INSERT INTO history_entries (id, provider, model, timestamp, diff, snapshot, trace_id) "
+            "SELECT id, provider, model, coalesce(timestamp, now()), diff, snapshot, trace_id FROM history_entries_legacy"
+        ))
+        conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence('history_entries', 'id'), "
+            "coalesce((SELECT max(id) FROM history_entries), 0) + 1, false)"
+        ))
+        conn.execute(text("DROP TABLE history_entries_legacy"))
+    return True
+
+def backfill_digests(chunk_size: int = 1000) -> int:
+    """
+    Computes registry_entries.digests for rows written before the column existed.
+    """
+    db = SessionLocal()
+    count = 0
+    try:
+        while True:
+            rows = db.query(RegistryEntry).filter(RegistryEntry.digests.is_(None)).limit(chunk_size).all()
+            if not rows:
+                break
+            for row in rows:
+                row.digests = stored_digests(compute_entry_digests(row.data)[1])
+            db.commit()
+            count += len(rows)
+    finally:
+        db.close()
+    return count
+
+def backfill_typed_columns(chunk_size: int = 1000) -> int:
+    """
+    Fills the typed price / context window columns of registry_entries for
+    rows written before they existed. Rows with none of them set are
+    recomputed; ones whose data has no usable values simply stay NULL.
+    """
+    db = SessionLocal()
+    count = 0
+    try:
+        keys = db.query(RegistryEntry.provider, RegistryEntry.model).filter(
+            RegistryEntry.input_price_per_token.is_(None),
+            RegistryEntry.output_price_per_token.is_(None),
+            RegistryEntry.context_window.is_(None)
+        ).all()
+        for start in range(0, len(keys), chunk_size):
+            chunk = [tuple(k) for k in keys[start:start + chunk_size]]
+            rows = db.query(RegistryEntry).filter(
+                tuple_(RegistryEntry.provider, RegistryEntry.model).in_(chunk)
+            ).all()
+            for row in rows:
+                row.refresh_typed_columns()
+            db.commit()
+            count += len(rows)
+    finally:
+        db.close()
+    return count
+
+def rebuild_models(chunk_size: int = 1000) -> int:
+    """
+    Rewrites the models projection from registry_entries. The workers keep
+    it current from then on; this covers entries written before they did.
+    """
+    db = SessionLocal()
+    try:
+        models = []
+        for row in db.query(RegistryEntry).yield_per(chunk_size):
+            model_data = flatten_registry_entry(row.data)
+            if model_data:
+                models.append(model_data)
+        return bulk_upsert_models(db, models, chunk_size)
+    finally:
+        db.close()
+
+def upgrade():
+    create_tables()
+    with engine.begin() as conn:
+        for statement in UPGRADES:
+            print(f"Applying: {statement}")
+            conn.execute(text(statement))
+    if partition_history():
+        print("Converted history_entries to monthly partitions.")
+    with engine.begin() as conn:
+        ensure_history_partitions(conn)
+    print(f"Backfilled digests for {backfill_digests()} registry entries.")
+    print(f"Backfilled typed columns for {backfill_typed_columns()} registry entries.")
+    print(f"Rebuilt {rebuild_models()} rows of the models projection.")
+
+if __name__ == "__main__":
+    print("Upgrading database schema...")
+    upgrade()
+    print("Schema is up to date.")